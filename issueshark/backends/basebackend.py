@@ -1,22 +1,72 @@
 import abc
+import importlib
 import os
+import pkgutil
 import sys
 import logging
 
+try:
+    from importlib.metadata import entry_points
+except ImportError:
+    # importlib.metadata is only available since python 3.8
+    entry_points = None
+
+BACKENDS_DIR = os.path.dirname(os.path.realpath(__file__))
+ENTRY_POINT_GROUP = 'issueshark.backends'
+
+#: Backends that are shipped with issueSHARK (identifier -> module:class). These can be listed and loaded without
+#: importing all other backends. The same backends are registered as entry points in the setup.py, this mapping is
+#: used if issueSHARK is run without being installed
+BUILTIN_BACKENDS = {
+    'bugzilla': 'issueshark.backends.bugzilla:BugzillaBackend',
+    'bugzillaOld': 'issueshark.backends.bugzilla_old:BugzillaBackend',
+    'github': 'issueshark.backends.github:GithubBackend',
+    'jira': 'issueshark.backends.jirabackend:JiraBackend',
+    'jiraOld': 'issueshark.backends.jirabackend_old:JiraBackend',
+}
+
+
+def _cached_import(name):
+    """
+    Imports a module, if it is not already imported
+
+    :param name: full dotted name of the module (e.g., issueshark.backends.github)
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        module = importlib.import_module(name)
+    return module
+
+
+def _get_entry_point_backends():
+    """
+    Gets the backends that are registered as entry points in the group :const:`ENTRY_POINT_GROUP`
+    (identifier -> module:class). Only the metadata of the installed packages is read, nothing is imported
+    """
+    if entry_points is None:
+        return {}
+
+    all_entry_points = entry_points()
+    if hasattr(all_entry_points, 'select'):
+        backend_entry_points = all_entry_points.select(group=ENTRY_POINT_GROUP)
+    else:
+        backend_entry_points = all_entry_points.get(ENTRY_POINT_GROUP, [])
+
+    return {entry_point.name: entry_point.value for entry_point in backend_entry_points}
+
 
 class BaseBackend(metaclass=abc.ABCMeta):
     """
     BaseBackend from which all backends must inherit
     """
+    _backends_loaded = False
+    _identifier_map = {}
+    _registered_backends = None
 
-    @abc.abstractproperty
-    def identifier(self):
-        """
-        Identifier of the backend
-
-        .. WARNING:: Must be unique among all backends
-        """
-        return
+    #: Identifier of the backend. Must be set as class attribute by every backend.
+    #:
+    #: .. WARNING:: Must be unique among all backends
+    identifier = None
 
     def __init__(self, cfg, issue_system_id, project_id):
         """
@@ -42,44 +92,102 @@ class BaseBackend(metaclass=abc.ABCMeta):
         pass
 
     @staticmethod
-    def _import_backends():
+    def _get_identifier(backend_class):
         """
-        Imports all backends that are in the backends folder
+        Gets the identifier of a backend class. Raises a TypeError if the backend does not define its identifier, as it
+        must be readable without instantiating the backend
+
+        :param backend_class: class that inherits from :class:`~issueshark.backends.basebackend.BaseBackend`
         """
-        backend_files = [x[:-3] for x in os.listdir(os.path.dirname(os.path.realpath(__file__))) if x.endswith(".py")]
-        sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
-        for backend in backend_files:
-            __import__(backend)
+        if backend_class.identifier is None:
+            raise TypeError('Backend %s does not define an identifier.' % backend_class.__name__)
+        return backend_class.identifier
 
     @staticmethod
-    def find_fitting_backend(cfg, issue_system_id, project_id):
+    def _import_backends(flush_cache=False):
         """
-        Finds a fitting backend by first importing all backends and checking if the identifier of the backend
-        matches the identifier given by the user
+        Imports all backends that are in the backends folder. As the backends do not change during runtime, the
+        folder is only scanned on the first call
 
-        :param cfg: holds als configuration. Object of class :class:`~issueshark.config.Config`
-        :param issue_system_id: id of the issue system for which data should be collected. :class:`bson.objectid.ObjectId`
-        :param project_id: id of the project to which the issue system belongs. :class:`bson.objectid.ObjectId`
+        :param flush_cache: if True, the backends folder is scanned again, even if it was already scanned before
         """
-        BaseBackend._import_backends()
+        if BaseBackend._backends_loaded and not flush_cache:
+            return
 
+        # The backends are imported as part of this package, so that the sys.path does not need to be modified
+        for _, backend, is_pkg in pkgutil.iter_modules([BACKENDS_DIR]):
+            if not is_pkg:
+                _cached_import('%s.%s' % (__package__, backend))
+
+        # Map the identifiers to the backend classes. If two backends share an identifier, the first one is used
+        identifier_map = {}
         for sc in BaseBackend.__subclasses__():
-            backend = sc(cfg, issue_system_id, project_id)
-            if backend.identifier == cfg.identifier:
-                return backend
+            identifier_map.setdefault(BaseBackend._get_identifier(sc), sc)
 
-        return None
+        BaseBackend._identifier_map = identifier_map
+        BaseBackend._backends_loaded = True
 
     @staticmethod
-    def get_all_possible_backend_options():
+    def _get_registered_backends():
+        """
+        Gets all backends that are registered via entry points or shipped with issueSHARK (identifier -> module:class)
+        """
+        if BaseBackend._registered_backends is None:
+            registered_backends = dict(BUILTIN_BACKENDS)
+            registered_backends.update(_get_entry_point_backends())
+            BaseBackend._registered_backends = registered_backends
+
+        return BaseBackend._registered_backends
+
+    @staticmethod
+    def _get_backend_class(identifier):
         """
-        Returns all possible backend options by importing the backends and getting their identifier
+        Gets the backend class for the identifier. Registered backends are imported directly, all other backends are
+        searched by importing all backends in the backends folder. Raises a ValueError if a registered backend does
+        not have the identifier it is registered with (e.g., because of a mistyped entry point)
+
+        :param identifier: identifier of the backend
         """
+        reference = BaseBackend._get_registered_backends().get(identifier)
+        if reference is not None:
+            module_name, class_name = reference.split(':')
+            backend_class = getattr(_cached_import(module_name), class_name)
+            if BaseBackend._get_identifier(backend_class) != identifier:
+                raise ValueError('Backend %s is registered as %s, but its identifier is %s.' %
+                                 (reference, identifier, backend_class.identifier))
+            return backend_class
+
         BaseBackend._import_backends()
+        return BaseBackend._identifier_map.get(identifier)
 
-        choices = set()
-        for sc in BaseBackend.__subclasses__():
-            backend = sc(None, None, None)
-            choices.add(backend.identifier)
+    @staticmethod
+    def find_fitting_backend(cfg, issue_system_id, project_id):
+        """
+        Finds a fitting backend by importing the backend whose identifier matches the identifier given by the user
+
+        :param cfg: holds als configuration. Object of class :class:`~issueshark.config.Config`
+        :param issue_system_id: id of the issue system for which data should be collected. :class:`bson.objectid.ObjectId`
+        :param project_id: id of the project to which the issue system belongs. :class:`bson.objectid.ObjectId`
+        """
+        backend_class = BaseBackend._get_backend_class(cfg.identifier)
+        if backend_class is None:
+            return None
 
+        return backend_class(cfg, issue_system_id, project_id)
+
+    @staticmethod
+    def get_all_possible_backend_options():
+        """
+        Returns all possible backend options. Registered backends are not imported, only additional backends in the
+        backends folder are imported to read their identifier
+        """
+        registered_backends = BaseBackend._get_registered_backends()
+        registered_modules = {reference.split(':')[0] for reference in registered_backends.values()}
+        for _, backend, is_pkg in pkgutil.iter_modules([BACKENDS_DIR]):
+            name = '%s.%s' % (__package__, backend)
+            if not is_pkg and name not in registered_modules:
+                _cached_import(name)
+
+        choices = set(registered_backends)
+        choices.update(BaseBackend._get_identifier(sc) for sc in BaseBackend.__subclasses__())
         return choices
@@ -1,35 +1,37 @@
-import sys
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import re
 
-import dateutil.parser
-from mongoengine import DoesNotExist
-import copy
+from bson import ObjectId
+from mongoengine import ListField
 
 from issueshark.backends.basebackend import BaseBackend
 from issueshark.backends.helpers.bugzillaagent import BugzillaAgent
-from validate_email import validate_email
+from issueshark.backends.helpers.parsing import parse_date
+from issueshark.backends.helpers.storage import BULK_INSERT_SIZE, create_indexes, insert_documents, upsert_issues
 import logging
 
 from pycoshark.mongomodels import Issue, People, Event, IssueComment
 
 logger = logging.getLogger('backend')
+BUG_LIST_PAGE_SIZE = 500
+ISSUE_DETAIL_WORKERS = 16
+EMAIL_REGEX = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 
 
 class BugzillaBackend(BaseBackend):
     """
     Backend that collects data from a Bugzilla REST API
     """
-    @property
-    def identifier(self):
-        """
-        Identifier (bugzilla)
-        """
-        return 'bugzilla'
+    #: Identifier (bugzilla)
+    identifier = 'bugzilla'
 
     def __init__(self, cfg, issue_system_id, project_id):
         """
         Initialization
         Initializes the people dictionary see: :func:`~issueshark.backends.bugzilla.BugzillaBackend._get_people`
         Initializes the attribute mapping: Maps attributes from the bugzilla API to our database design
+        Initializes the field mapping: Maps attributes from the bugzilla API to the functions that parse them
 
 
         :param cfg: holds als configuration. Object of class :class:`~issueshark.config.Config`
@@ -41,6 +43,8 @@ class BugzillaBackend(BaseBackend):
         logger.setLevel(self.debug_level)
         self.bugzilla_agent = None
         self.people = {}
+        self.users = {}
+        self.issue_id_cache = {}
 
         self.at_mapping = {
             'assigned_to_detail': 'assignee_id',
@@ -63,6 +67,58 @@ class BugzillaBackend(BaseBackend):
             'type': 'issue_type',
         }
 
+        # Maps the attributes from the bugzilla API to the function that parses them
+        self.field_mapping = {
+            'assigned_to_detail': self._parse_author_details,
+            'blocks': self._parse_issue_links,
+            'component': self._parse_string_field,
+            'creation_time': self._parse_date_field,
+            'creator_detail': self._parse_author_details,
+            'depends_on': self._parse_issue_links,
+            'dupe_of': self._parse_issue_links,
+            'keywords': self._parse_array_field,
+            'last_change_time': self._parse_date_field,
+            'op_sys': self._parse_string_field,
+            'platform': self._parse_string_field,
+            'resolution': self._parse_string_field,
+            'severity': self._parse_string_field,
+            'status': self._parse_string_field,
+            'summary': self._parse_string_field,
+            'target_milestone': self._parse_string_field,
+            'version': self._parse_string_field,
+            'type': self._parse_type_field,
+        }
+
+        # Maps the issue link attributes from the bugzilla API to the type and effect of the link
+        self.link_type_mapping = {
+            'blocks': 'Blocker',
+            'dupe_of': 'Duplicate',
+            'depends_on': 'Dependent',
+        }
+
+        self.link_effect_mapping = {
+            'blocks': 'blocks',
+            'dupe_of': 'duplicates',
+            'depends_on': 'depends on'
+        }
+
+        # Partitions the attribute mapping, so that plain values and dates can be set without going through
+        # _parse_bz_field. All other fields (e.g., people, links) are parsed and fields of list type are merged
+        self.direct_fields = []
+        self.date_fields = []
+        self.parsed_fields = []
+        self.list_fields = []
+        for at_name_bz, at_name_mongo in self.at_mapping.items():
+            parse_function = self.field_mapping[at_name_bz]
+            if isinstance(Issue._fields[at_name_mongo], ListField):
+                self.list_fields.append((at_name_bz, at_name_mongo))
+            elif parse_function in (self._parse_string_field, self._parse_array_field):
+                self.direct_fields.append((at_name_bz, at_name_mongo))
+            elif parse_function == self._parse_date_field:
+                self.date_fields.append((at_name_bz, at_name_mongo))
+            else:
+                self.parsed_fields.append((at_name_bz, at_name_mongo))
+
     def process(self):
         """
         Gets all the issues and their updates
@@ -71,11 +127,17 @@ class BugzillaBackend(BaseBackend):
 
         2. Gets all issues that was last change since this value
 
-        3. Processes the results in 50-steps
+        3. Processes the results in pages of :const:`BUG_LIST_PAGE_SIZE` bugs, \
+        see :func:`issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_bug_pages`
+
+        4. Requests the comments and the history of the issues of a page concurrently, see \
+        :func:`issueshark.backends.bugzilla.BugzillaBackend._get_issue_details`
 
-        4. For each issue calls: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_issue`
+        5. For each issue calls: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_issue`
         """
         self.bugzilla_agent = BugzillaAgent(logger, self.config)
+        create_indexes()
+
         # Get last modification date (since then, we will collect bugs)
         last_issue = Issue.objects(issue_system_id=self.issue_system_id).order_by('-updated_at')\
             .only('updated_at').first()
@@ -83,125 +145,190 @@ class BugzillaBackend(BaseBackend):
         if last_issue is not None:
            starting_date = last_issue.updated_at
 
-        # Get all issues
-        issues = self.bugzilla_agent.get_bug_list(last_change_time=starting_date, limit=50)
+        # Go through all issues (and all pages). Issues are upserted in bulk once per page, events and comments are
+        # collected over several issues and inserted in bulk
+        found_issues = False
+        issues_to_upsert = []
+        events_to_insert = []
+        comments_to_insert = []
+        with ThreadPoolExecutor(max_workers=ISSUE_DETAIL_WORKERS) as executor:
+            for issues in self.bugzilla_agent.get_bug_pages(starting_date, BUG_LIST_PAGE_SIZE):
+                found_issues = True
+                logger.info("Processing %d issues..." % len(issues))
+                mongo_issues = self._get_page_issues(issues)
+
+                # Comments and histories of the whole page are requested concurrently, while the issues are stored
+                # one after another in the order of the page
+                details = executor.map(self._get_issue_details, issues)
+                for issue, (comments, histories) in zip(issues, details):
+                    logger.info("Processing issue %s" % issue['id'])
+                    self._process_issue(issue, comments, histories, mongo_issues[str(issue['id'])], issues_to_upsert,
+                                        events_to_insert, comments_to_insert)
 
-        # If no new bugs found, return
-        if len(issues) == 0:
-            logger.info('No new issues found. Exiting...')
-            sys.exit(0)
+                    if len(events_to_insert) + len(comments_to_insert) >= BULK_INSERT_SIZE:
+                        upsert_issues(issues_to_upsert)
+                        insert_documents(events_to_insert, comments_to_insert)
 
-        # Otherwise, go through all issues
-        processed_results = 50
-        while len(issues) > 0:
-            logger.info("Processing %d issues..." % len(issues))
-            for issue in issues:
-                logger.info("Processing issue %s" % issue['id'])
-                self._process_issue(issue)
+                upsert_issues(issues_to_upsert)
 
-            # Go through the next issues
-            issues = self.bugzilla_agent.get_bug_list(last_change_time=starting_date, limit=50, offset=processed_results)
-            processed_results += 50
+        insert_documents(events_to_insert, comments_to_insert)
 
-    def _process_issue(self, issue):
+        if not found_issues:
+            logger.info('No new issues found.')
+
+    def _get_issue_details(self, issue):
         """
-        Processes the issue in several steps:
+        Gets the comments and the history of an issue
+
+        :param issue: issue that was got from the bugzilla REST API
+        :return: tuple of the comments and the histories of the issue
+        """
+        return self.bugzilla_agent.get_comments(issue['id']), self.bugzilla_agent.get_issue_history(issue['id'])
 
-        1. Get all comments. See: :func:`issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_comments`
+    def _get_page_issues(self, issues):
+        """
+        Gets the stored issues of a page with one query and puts their ids into the issue id cache. Issues that are not
+        stored yet get their id assigned here, so that links to them can be resolved before they are upserted,
+        see :func:`~issueshark.backends.helpers.storage.upsert_issues`
+
+        :param issues: issues of one page that were got from the bugzilla REST API
+        :return: dictionary that maps the external id of each issue to its :class:`~pycoshark.mongomodels.Issue`
+        """
+        external_ids = [str(issue['id']) for issue in issues]
+        mongo_issues = {mongo_issue.external_id: mongo_issue for mongo_issue in
+                        Issue.objects(issue_system_id=self.issue_system_id, external_id__in=external_ids)}
+
+        for external_id in external_ids:
+            if external_id not in mongo_issues:
+                mongo_issues[external_id] = Issue(id=ObjectId(), issue_system_id=self.issue_system_id,
+                                                  external_id=external_id)
+            self.issue_id_cache[external_id] = mongo_issues[external_id].id
 
-        2. Get the whole issue history.\
-        See: :func:`issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_issue_history`
+        return mongo_issues
+
+    @staticmethod
+    def _get_stored_external_ids(document_class, issue_id, external_ids):
+        """
+        Gets the external ids of the documents of an issue that are already stored. The collection is queried directly,
+        as only the external ids are needed and no documents need to be created
+
+        :param document_class: class of the documents (e.g., :class:`~pycoshark.mongomodels.Event`)
+        :param issue_id: id of the issue to which the documents belong
+        :param external_ids: external ids that should be checked
+        :return: set of the external ids that are already stored
+        """
+        cursor = document_class._get_collection().find({'issue_id': issue_id, 'external_id': {'$in': external_ids}},
+                                                       {'_id': 0, 'external_id': 1})
+        return {document['external_id'] for document in cursor}
 
-        3. Transforms the issue to our issue model. \
+    def _process_issue(self, issue, comments, histories, mongo_issue, issues_to_upsert, events_to_insert,
+                       comments_to_insert):
+        """
+        Processes the issue in several steps:
+
+        1. Transforms the issue to our issue model. \
         See: :func:`issueshark.backends.bugzilla.BugzillaBackend._transform_issue`
 
-        4. Go through the history of the issue (newest to oldes) and store the events. \
+        2. Go through the history of the issue (newest to oldes) and create the events. \
         See: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_event`
 
-        5. Process all comments. See: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_comments`
+        3. Process all comments. See: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_comments`
+
+        The issue, events, and comments are only collected in the given lists, the caller writes them, see \
+        :func:`~issueshark.backends.helpers.storage.upsert_issues` and \
+        :func:`~issueshark.backends.helpers.storage.insert_documents`
 
         :param issue: issue that was got from the bugzilla REST API
+        :param comments: comments of the issue, see :func:`~issueshark.backends.bugzilla.BugzillaBackend._get_issue_details`
+        :param histories: history of the issue
+        :param mongo_issue: stored issue (or new issue with an id), \
+        see :func:`~issueshark.backends.bugzilla.BugzillaBackend._get_page_issues`
+        :param issues_to_upsert: list to which the transformed issue is appended
+        :param events_to_insert: list to which new events are appended
+        :param comments_to_insert: list to which new comments are appended
         """
         # Transform issue
-        comments = self.bugzilla_agent.get_comments(issue['id'])
-        histories = self.bugzilla_agent.get_issue_history(issue['id'])
-        mongo_issue = self._transform_issue(issue, comments)
+        self._prefetch_users(histories, comments)
+        mongo_issue = self._transform_issue(issue, comments, mongo_issue, issues_to_upsert)
 
         logger.debug('Transformed issue: %s', mongo_issue)
 
-        self._store_events(histories, issue, mongo_issue)
+        self._store_events(histories, issue, mongo_issue, events_to_insert)
 
         # Store comments
-        self._process_comments(mongo_issue.id, comments)
+        self._process_comments(mongo_issue.id, comments, comments_to_insert)
 
-    def _store_events(self, histories, issue, mongo_issue):
-        # Store events
-        j = 0
-        events_to_insert = []
-        for history in histories:
-            i = 0
-            change_date = dateutil.parser.parse(history['when'])
-            author_id = self._get_people(history['who'])
-            for bz_event in history['changes']:
-                logger.debug("Processing event: %s" % bz_event)
-                unique_event_id = str(issue['id']) + "%%" + str(i) + "%%" + str(j)
-                mongo_event, is_new_event = self._process_event(unique_event_id, bz_event, mongo_issue, change_date,
-                                                                author_id)
-                logger.debug('Newly created?: %s, Resulting event: %s' % (is_new_event, mongo_event))
-
-                # Append to list if event is not stored in db
-                if is_new_event:
-                    events_to_insert.append(mongo_event)
+    def _store_events(self, histories, issue, mongo_issue, events_to_insert):
+        """
+        Creates the events of the issue history that are not stored yet
 
-                i += 1
-            j += 1
+        :param histories: history of the issue that was received from the bugzilla API
+        :param issue: issue that was got from the bugzilla REST API
+        :param mongo_issue: issue that is/should be stored in the mongodb
+        :param events_to_insert: list to which new events are appended, the caller needs to insert them
+        """
+        # The id of an event is <issue id>%%<change index>%%<history index>. The ids are built once per history and
+        # the ids of all events of this issue that are already stored are got with one query
+        prefix = str(issue['id']) + "%%"
+        new_histories = []
+        for j, history in enumerate(histories):
+            suffix = "%%" + str(j)
+            new_histories.append((history, parse_date(history['when']),
+                                  [prefix + str(i) + suffix for i in range(len(history['changes']))]))
+        stored_event_ids = self._get_stored_external_ids(
+            Event, mongo_issue.id, [event_id for _, _, event_ids in new_histories for event_id in event_ids]
+        )
+
+        for history, change_date, unique_event_ids in new_histories:
+            author_id = self._get_people(history['who'])
+            for unique_event_id, bz_event in zip(unique_event_ids, history['changes']):
+                # Stored events do not change anymore
+                if unique_event_id in stored_event_ids:
+                    continue
 
-        # Store events
-        if events_to_insert:
-            Event.objects.insert(events_to_insert, load_bulk=False)
+                logger.debug("Processing event: %s" % bz_event)
+                mongo_event = self._process_event(unique_event_id, bz_event, mongo_issue, change_date, author_id)
+                logger.debug('Resulting event: %s' % mongo_event)
+                events_to_insert.append(mongo_event)
 
-    def _process_comments(self, mongo_issue_id, comments):
+    def _process_comments(self, mongo_issue_id, comments, comments_to_insert):
         """
         Processes the comments for an issue
 
         :param mongo_issue_id: Object of class :class:`bson.objectid.ObjectId`. Identifier of the document that holds \
         the issue information
         :param comments: comments that were received from the bugzilla API
+        :param comments_to_insert: list to which new comments are appended, the caller needs to insert them
         """
+        # Comment with count 0 is the description of the bug
+        comments = [comment for comment in comments if comment['count'] != 0]
+        prefix = "%s%%" % mongo_issue_id
+        unique_comment_ids = [prefix + str(i) for i in range(len(comments))]
+
+        # Get the ids of all comments of this issue that are already stored with one query
+        stored_comment_ids = self._get_stored_external_ids(IssueComment, mongo_issue_id, unique_comment_ids)
+
         # Go through all comments of the issue
-        comments_to_insert = []
-        logger.info('Processing %d comments...' % (len(comments)-1))
-        i = -1
-        for comment in comments:
-            # Comment with count 0 is the description of the bug
-            if comment['count'] == 0:
+        logger.info('Processing %d comments...' % len(comments))
+        for unique_comment_id, comment in zip(unique_comment_ids, comments):
+            if unique_comment_id in stored_comment_ids:
                 continue
 
-            i += 1
             logger.debug('Processing comment: %s' % comment)
-            unique_comment_id = "%s%%%s" % (mongo_issue_id, i)
-            try:
-                IssueComment.objects(external_id=unique_comment_id, issue_id=mongo_issue_id).get()
-                continue
-            except DoesNotExist:
-                mongo_comment = IssueComment(
-                    external_id=unique_comment_id,
-                    issue_id=mongo_issue_id,
-                    created_at=dateutil.parser.parse(comment['creation_time']),
-                    author_id=self._get_people(comment['creator']),
-                    comment=comment['text'],
-                )
-                logger.debug('Resulting comment: %s' % mongo_comment)
-                comments_to_insert.append(mongo_comment)
-
-        # If comments need to be inserted -> bulk insert
-        if comments_to_insert:
-            IssueComment.objects.insert(comments_to_insert, load_bulk=False)
+            mongo_comment = {
+                'external_id': unique_comment_id,
+                'issue_id': mongo_issue_id,
+                'created_at': parse_date(comment['creation_time']),
+                'author_id': self._get_people(comment['creator']),
+                'comment': comment['text'],
+            }
+            logger.debug('Resulting comment: %s' % mongo_comment)
+            comments_to_insert.append(mongo_comment)
 
     def _process_event(self, unique_event_id, bz_event, mongo_issue, change_date, author_id):
         """
-        Processes the event. During the event processing the Issue is set back to its original state
-        before the event occured.
+        Creates the event, which is not yet stored in the database. The event is created as raw document (dictionary
+        with the fields of :class:`~pycoshark.mongomodels.Event`), as it is inserted directly into the collection
 
         :param unique_event_id: unique identifier of the event
         :param bz_event: event that was received from the bugzilla API
@@ -209,16 +336,12 @@ class BugzillaBackend(BaseBackend):
         :param change_date: date when the event was created
         :param author_id: :class:`bson.objectid.ObjectId` of the author of the event
         """
-        try:
-            mongo_event = Event.objects(external_id=unique_event_id, issue_id=mongo_issue.id).get()
-            return mongo_event, False
-        except DoesNotExist:
-            mongo_event = Event(
-                external_id=unique_event_id,
-                issue_id=mongo_issue.id,
-                created_at=change_date,
-                author_id=author_id
-            )
+        mongo_event = {
+            'external_id': unique_event_id,
+            'issue_id': mongo_issue.id,
+            'created_at': change_date,
+            'author_id': author_id,
+        }
 
         # We need to map back the status from the bz terminology to ours. Special: The assigned_to must be mapped to
         # assigned_to_detail beforehand, as we are using this for the issue parsing
@@ -228,43 +351,43 @@ class BugzillaBackend(BaseBackend):
             bz_at_name = bz_event['field_name']
 
         try:
-            mongo_event.status = self.at_mapping[bz_at_name]
+            mongo_event['status'] = self.at_mapping[bz_at_name]
         except KeyError:
             logger.warning('Mapping for attribute %s not found.' % bz_at_name)
-            mongo_event.status = bz_at_name
+            mongo_event['status'] = bz_at_name
 
-        if mongo_event.status == 'assignee_id':
+        if mongo_event['status'] == 'assignee_id':
             if bz_event['added'] is not None and bz_event['added']:
                 people_id = self._get_people(bz_event['added'])
-                mongo_event.new_value = people_id
+                mongo_event['new_value'] = people_id
 
             if bz_event['removed'] is not None and bz_event['removed']:
                 people_id = self._get_people(bz_event['removed'])
-                mongo_event.old_value = people_id
+                mongo_event['old_value'] = people_id
         elif bz_event['field_name'] == 'depends_on':
             if bz_event['added'] is not None and bz_event['added']:
                 issue_id = self._get_issue_id_by_system_id(bz_event['added'])
-                mongo_event.new_value = {'issue_id': issue_id, 'type': 'Dependent', 'effect': 'depends on'}
+                mongo_event['new_value'] = {'issue_id': issue_id, 'type': 'Dependent', 'effect': 'depends on'}
 
             if bz_event['removed'] is not None and bz_event['removed']:
                 issue_id = self._get_issue_id_by_system_id(bz_event['removed'])
-                mongo_event.old_value = {'issue_id': issue_id, 'type': 'Dependent', 'effect': 'depends on'}
+                mongo_event['old_value'] = {'issue_id': issue_id, 'type': 'Dependent', 'effect': 'depends on'}
         elif bz_event['field_name'] == 'blocks':
             if bz_event['added'] is not None and bz_event['added']:
                 issue_id = self._get_issue_id_by_system_id(bz_event['added'])
-                mongo_event.new_value = {'issue_id': issue_id, 'type': 'Blocker', 'effect': 'blocks'}
+                mongo_event['new_value'] = {'issue_id': issue_id, 'type': 'Blocker', 'effect': 'blocks'}
 
             if bz_event['removed'] is not None and bz_event['removed']:
                 issue_id = self._get_issue_id_by_system_id(bz_event['removed'])
-                mongo_event.old_value = {'issue_id': issue_id, 'type': 'Blocker', 'effect': 'blocks'}
+                mongo_event['old_value'] = {'issue_id': issue_id, 'type': 'Blocker', 'effect': 'blocks'}
         else:
             if bz_event['added'] is not None and bz_event['added']:
-                mongo_event.new_value = bz_event['added']
+                mongo_event['new_value'] = bz_event['added']
 
             if bz_event['removed'] is not None and bz_event['removed']:
-                mongo_event.old_value = bz_event['removed']
+                mongo_event['old_value'] = bz_event['removed']
 
-        return mongo_event, True
+        return mongo_event
 
     def _parse_bz_field(self, bz_issue, at_name_bz):
         """
@@ -273,29 +396,7 @@ class BugzillaBackend(BaseBackend):
         :param bz_issue: bugzilla issue (returned by the API)
         :param at_name_bz: attribute name that should be parsed
         """
-        field_mapping = {
-            'assigned_to_detail': self._parse_author_details,
-            'blocks': self._parse_issue_links,
-            'component': self._parse_string_field,
-            'creation_time': self._parse_date_field,
-            'creator_detail': self._parse_author_details,
-            'depends_on': self._parse_issue_links,
-            'dupe_of': self._parse_issue_links,
-            'keywords': self._parse_array_field,
-            'last_change_time': self._parse_date_field,
-            'op_sys': self._parse_string_field,
-            'platform': self._parse_string_field,
-            'resolution': self._parse_string_field,
-            'severity': self._parse_string_field,
-            'status': self._parse_string_field,
-            'summary': self._parse_string_field,
-            'target_milestone': self._parse_string_field,
-            'version': self._parse_string_field,
-            'type': self._parse_type_field,
-        }
-
-        correct_function = field_mapping.get(at_name_bz)
-        return correct_function(bz_issue, at_name_bz)
+        return self.field_mapping[at_name_bz](bz_issue, at_name_bz)
 
     def _parse_author_details(self, bz_issue, at_name_bz):
         """
@@ -335,10 +436,11 @@ class BugzillaBackend(BaseBackend):
             ret = 'Bug'
 
         # in some versions of bugzilla a type is provided, we just try to make consistent
-        if 'type' in bz_issue.keys():
-            if bz_issue['type'].lower() == 'defect':
+        if 'type' in bz_issue:
+            issue_type = bz_issue['type'].lower()
+            if issue_type == 'defect':
                 ret = 'Bug'
-            elif bz_issue['type'].lower() == 'enhancement':
+            elif issue_type == 'enhancement':
                 ret = 'Enhancement'
             else:
                 ret = bz_issue['type']
@@ -360,32 +462,20 @@ class BugzillaBackend(BaseBackend):
         :param bz_issue: bugzilla issue (returned by the API)
         :param at_name_bz: attribute name that should be parsed
         """
-        type_mapping = {
-            'blocks': 'Blocker',
-            'dupe_of': 'Duplicate',
-            'depends_on': 'Dependent',
-        }
-
-        effect_mapping = {
-            'blocks': 'blocks',
-            'dupe_of': 'duplicates',
-            'depends_on': 'depends on'
-        }
-
         issue_links = []
         if isinstance(bz_issue[at_name_bz], list):
             for link in bz_issue[at_name_bz]:
                 issue_links.append({
                     'issue_id': self._get_issue_id_by_system_id(link),
-                    'type': type_mapping[at_name_bz],
-                    'effect': effect_mapping[at_name_bz]
+                    'type': self.link_type_mapping[at_name_bz],
+                    'effect': self.link_effect_mapping[at_name_bz]
                 })
         else:
             if bz_issue[at_name_bz] is not None:
                 issue_links.append({
                     'issue_id': self._get_issue_id_by_system_id(bz_issue[at_name_bz]),
-                    'type': type_mapping[at_name_bz],
-                    'effect': effect_mapping[at_name_bz]
+                    'type': self.link_type_mapping[at_name_bz],
+                    'effect': self.link_effect_mapping[at_name_bz]
                 })
 
         return issue_links
@@ -397,44 +487,47 @@ class BugzillaBackend(BaseBackend):
         :param bz_issue: bugzilla issue (returned by the API)
         :param at_name_bz: attribute name that should be parsed
         """
-        return dateutil.parser.parse(bz_issue[at_name_bz])
+        return parse_date(bz_issue[at_name_bz])
 
-    def _transform_issue(self, bz_issue, bz_comments):
+    def _transform_issue(self, bz_issue, bz_comments, mongo_issue, issues_to_upsert):
         """
         Transforms the issue from an bugzilla issue to our issue model
 
         :param bz_issue: bugzilla issue (returned by the API)
         :param bz_comments: comments to the bugzilla issue (as the first comment is the description of the issue)
-        :return:
+        :param mongo_issue: stored issue (or new issue with an id) that should be updated, \
+        see :func:`~issueshark.backends.bugzilla.BugzillaBackend._get_page_issues`
+        :param issues_to_upsert: list to which the validated issue is appended, the caller needs to upsert it. \
+        See: :func:`~issueshark.backends.helpers.storage.upsert_issues`
+        :return: the transformed issue
         """
-        try:
-            mongo_issue = Issue.objects(issue_system_id=self.issue_system_id, external_id=str(bz_issue['id'])).get()
-        except DoesNotExist:
-            mongo_issue = Issue(
-                issue_system_id=self.issue_system_id,
-                external_id=str(bz_issue['id'])
-            )
-
         # Set fields that can be directly mapped
-        for at_name_bz, at_name_mongo in self.at_mapping.items():
-            if isinstance(getattr(mongo_issue, at_name_mongo), list):
-                # Get the result and the current value and merge it together
-                result = self._parse_bz_field(bz_issue, at_name_bz)
-                current_value = getattr(mongo_issue, at_name_mongo, list())
-                if not isinstance(result, list):
-                    result = [result]
-
-                # Extend
-                current_value.extend(result)
-                if len(current_value) > 0 and at_name_mongo == 'issue_links':
-                    current_value = list({v['issue_id']: v for v in current_value}.values())
-                else:
-                    current_value = list(set(current_value))
-
-                # Set the attribute
-                setattr(mongo_issue, at_name_mongo, copy.deepcopy(current_value))
+        for at_name_bz, at_name_mongo in self.direct_fields:
+            setattr(mongo_issue, at_name_mongo, bz_issue[at_name_bz])
+
+        for at_name_bz, at_name_mongo in self.date_fields:
+            setattr(mongo_issue, at_name_mongo, parse_date(bz_issue[at_name_bz]))
+
+        # Set fields that need to be parsed
+        for at_name_bz, at_name_mongo in self.parsed_fields:
+            setattr(mongo_issue, at_name_mongo, self._parse_bz_field(bz_issue, at_name_bz))
+
+        # Several bugzilla attributes can be merged into the same list (e.g., issue_links). Therefore, the parsed
+        # values are collected first and merged with the current value only once per list
+        new_values = {}
+        for at_name_bz, at_name_mongo in self.list_fields:
+            result = self._parse_bz_field(bz_issue, at_name_bz)
+            if not isinstance(result, list):
+                result = [result]
+            new_values.setdefault(at_name_mongo, []).extend(result)
+
+        for at_name_mongo, values in new_values.items():
+            merged_values = itertools.chain(getattr(mongo_issue, at_name_mongo), values)
+            if at_name_mongo == 'issue_links':
+                current_value = list({v['issue_id']: v for v in merged_values}.values())
             else:
-                setattr(mongo_issue, at_name_mongo, self._parse_bz_field(bz_issue, at_name_bz))
+                current_value = list(set(merged_values))
+            setattr(mongo_issue, at_name_mongo, current_value)
 
         # The first comment is the description! Bugzilla does not have a separate description field. The comment
         # with the count == 0 is the description
@@ -455,7 +548,11 @@ class BugzillaBackend(BaseBackend):
         # else:
         #     mongo_issue.issue_type = 'Bug'
 
-        return mongo_issue.save()
+        mongo_issue.validate()
+        issues_to_upsert.append(mongo_issue)
+
+        self.issue_id_cache[mongo_issue.external_id] = mongo_issue.id
+        return mongo_issue
 
     def _get_mongo_attribute(self, field_name):
         """
@@ -465,6 +562,26 @@ class BugzillaBackend(BaseBackend):
         """
         return self.at_mapping[field_name]
 
+    def _prefetch_users(self, histories, comments):
+        """
+        Gets the details of all unknown authors of the histories and comments of an issue with one request, so that
+        :func:`~issueshark.backends.bugzilla.BugzillaBackend._get_people` does not need to request them one by one
+
+        :param histories: histories of the issue (returned by the API)
+        :param comments: comments of the issue (returned by the API)
+        """
+        usernames = {history['who'] for history in histories}
+        # The comment with count 0 is the description, its author is not stored
+        usernames.update(comment['creator'] for comment in comments if comment['count'] != 0)
+        unknown_usernames = [username for username in usernames
+                             if username not in self.people and username not in self.users]
+
+        if not unknown_usernames:
+            return
+
+        for user in self.bugzilla_agent.get_users(sorted(unknown_usernames)):
+            self.users[user['name']] = user
+
     def _get_people(self, username, email=None, name=None):
         """
         Gets people from the people collection
@@ -479,7 +596,10 @@ class BugzillaBackend(BaseBackend):
 
         # If email and name are not set, make a request to get the user
         if email is None and name is None:
-            user = self.bugzilla_agent.get_user(username)
+            if username in self.users:
+                user = self.users.pop(username)
+            else:
+                user = self.bugzilla_agent.get_user(username)
 
             # If the user is not found, we must use the username name
             if user is None:
@@ -492,7 +612,7 @@ class BugzillaBackend(BaseBackend):
             # Check if email is none, this can happen as an email address may be excluded from the return value
             if email is None:
                 # Check if the username is a valid email address, if yes use this
-                if validate_email(username):
+                if '@' in username and EMAIL_REGEX.match(username):
                     email = username
                 else:
                     email = "nobody@nobody.com"
@@ -509,9 +629,16 @@ class BugzillaBackend(BaseBackend):
 
         :param system_id: id of the issue in the bugzilla ITS
         """
-        try:
-            issue_id = Issue.objects(issue_system_id=self.issue_system_id, external_id=str(system_id)).only('id').get().id
-        except DoesNotExist:
-            issue_id = Issue(issue_system_id=self.issue_system_id, external_id=str(system_id)).save().id
+        external_id = str(system_id)
+        if external_id in self.issue_id_cache:
+            return self.issue_id_cache[external_id]
+
+        document = Issue._get_collection().find_one({'issue_system_id': self.issue_system_id,
+                                                     'external_id': external_id}, {'_id': 1})
+        if document is not None:
+            issue_id = document['_id']
+        else:
+            issue_id = Issue(issue_system_id=self.issue_system_id, external_id=external_id).save().id
 
+        self.issue_id_cache[external_id] = issue_id
         return issue_id
@@ -1,29 +1,32 @@
-import sys
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import re
 
-import dateutil.parser
-from mongoengine import DoesNotExist
-import copy
+from bson import ObjectId
+from mongoengine import DoesNotExist, ListField
+from pymongo import UpdateOne
 
 from issueshark.backends.basebackend import BaseBackend
 from issueshark.backends.helpers.bugzillaagent import BugzillaAgent
-from validate_email import validate_email
+from issueshark.backends.helpers.parsing import as_utc, parse_date
+from issueshark.backends.helpers.storage import BULK_INSERT_SIZE, create_indexes, insert_documents, store_people
 import logging
 
 from pycoshark.mongomodels import Issue, People, Event, IssueComment
 
 logger = logging.getLogger('backend')
+LINK_FIELDS = ('blocks', 'depends_on', 'dupe_of')
+BUG_LIST_PAGE_SIZE = 500
+ISSUE_DETAIL_WORKERS = 8
+EMAIL_REGEX = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 
 
 class BugzillaBackend(BaseBackend):
     """
     Backend that collects data from a Bugzilla REST API
     """
-    @property
-    def identifier(self):
-        """
-        Identifier (bugzilla)
-        """
-        return 'bugzillaOld'
+    #: Identifier (bugzilla)
+    identifier = 'bugzillaOld'
 
     def __init__(self, cfg, issue_system_id, project_id):
         """
@@ -41,6 +44,7 @@ class BugzillaBackend(BaseBackend):
         logger.setLevel(self.debug_level)
         self.bugzilla_agent = None
         self.people = {}
+        self.issue_id_cache = {}
 
         self.at_mapping = {
             'assigned_to_detail': 'assignee_id',
@@ -62,6 +66,64 @@ class BugzillaBackend(BaseBackend):
             'version': 'affects_versions'
         }
 
+        # Maps the attributes from the bugzilla API to the function that parses them
+        self.field_mapping = {
+            'assigned_to_detail': self._parse_author_details,
+            'blocks': self._parse_issue_links,
+            'component': self._parse_string_field,
+            'creation_time': self._parse_date_field,
+            'creator_detail': self._parse_author_details,
+            'depends_on': self._parse_issue_links,
+            'dupe_of': self._parse_issue_links,
+            'keywords': self._parse_array_field,
+            'last_change_time': self._parse_date_field,
+            'op_sys': self._parse_string_field,
+            'platform': self._parse_string_field,
+            'resolution': self._parse_string_field,
+            'severity': self._parse_string_field,
+            'status': self._parse_string_field,
+            'summary': self._parse_string_field,
+            'target_milestone': self._parse_string_field,
+            'version': self._parse_string_field,
+        }
+
+        # Maps the attributes of the issue document to the function that sets them back to the state before an event
+        self.function_mapping = {
+            'title': self._set_back_string_field,
+            'priority': self._set_back_priority,
+            'status': self._set_back_string_field,
+            'affects_versions': self._set_back_array_field,
+            'components': self._set_back_array_field,
+            'labels': self._set_back_array_field,
+            'resolution': self._set_back_string_field,
+            'fix_versions': self._set_back_array_field,
+            'assignee_id': self._set_back_assignee,
+            'issue_links': self._set_back_issue_links,
+            'environment': self._set_back_string_field,
+            'platform': self._set_back_string_field
+        }
+
+        # Maps the issue link attributes from the bugzilla API to the type of the link
+        self.link_type_mapping = {
+            'blocks': 'Blocker',
+            'dupe_of': 'Duplicate',
+            'depends_on': 'Dependent',
+        }
+
+        # Fields of the issue document, to decide whether an event can be processed with the issue
+        self.issue_fields = frozenset(Issue._fields)
+
+        # Splits the attribute mapping into fields of list type, which are merged with the stored value, and all
+        # other fields, which are overwritten. Each entry holds the function that parses the attribute
+        self.list_fields = []
+        self.scalar_fields = []
+        for at_name_bz, at_name_mongo in self.at_mapping.items():
+            entry = (at_name_bz, at_name_mongo, self.field_mapping[at_name_bz])
+            if isinstance(Issue._fields[at_name_mongo], ListField):
+                self.list_fields.append(entry)
+            else:
+                self.scalar_fields.append(entry)
+
     def process(self):
         """
         Gets all the issues and their updates
@@ -70,11 +132,17 @@ class BugzillaBackend(BaseBackend):
 
         2. Gets all issues that was last change since this value
 
-        3. Processes the results in 50-steps
+        3. Processes the results in pages of :const:`BUG_LIST_PAGE_SIZE` bugs, \
+        see :func:`issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_bug_pages`
+
+        4. Requests the comments and the history of the issues of a page concurrently, see \
+        :func:`issueshark.backends.bugzilla_old.BugzillaBackend._get_issue_details`
 
-        4. For each issue calls: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_issue`
+        5. For each issue calls: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_issue`
         """
         self.bugzilla_agent = BugzillaAgent(logger, self.config)
+        create_indexes()
+
         # Get last modification date (since then, we will collect bugs)
         last_issue = Issue.objects(issue_system_id=self.issue_system_id).order_by('-updated_at')\
             .only('updated_at').first()
@@ -82,49 +150,143 @@ class BugzillaBackend(BaseBackend):
         if last_issue is not None:
             starting_date = last_issue.updated_at
 
-        # Get all issues
-        issues = self.bugzilla_agent.get_bug_list(last_change_time=starting_date, limit=50)
-
-        # If no new bugs found, return
-        if len(issues) == 0:
+        # Go through all issues (and all pages). Events and comments are collected over the issues of a page and
+        # inserted in bulk
+        found_issues = False
+        events_to_insert = []
+        comments_to_insert = []
+        with ThreadPoolExecutor(max_workers=ISSUE_DETAIL_WORKERS) as executor:
+            for issues in self.bugzilla_agent.get_bug_pages(starting_date, BUG_LIST_PAGE_SIZE):
+                found_issues = True
+                logger.info("Processing %d issues..." % len(issues))
+
+                stored_issues, stored_event_ids, stored_comment_ids = self._get_stored_documents(issues)
+                for mongo_issue in stored_issues.values():
+                    self.issue_id_cache[mongo_issue.external_id] = mongo_issue.id
+
+                # Issues that did not change since they were stored (e.g., the last issue of the previous run) are
+                # skipped, so that neither their comments nor their history need to be requested
+                changed_issues = [issue for issue in issues
+                                  if not self._is_unchanged(issue, stored_issues.get(str(issue['id'])))]
+
+                # Comments and histories of the whole page are requested concurrently, while the issues are processed
+                # one after another in the order of the page
+                details = executor.map(self._get_issue_details, changed_issues)
+                self._prefetch_issue_ids(self._get_linked_system_ids(changed_issues, []))
+                for issue, (comments, histories) in zip(changed_issues, details):
+                    logger.info("Processing issue %s" % issue['id'])
+                    self._process_issue(issue, comments, histories, events_to_insert, comments_to_insert,
+                                        stored_issues, stored_event_ids, stored_comment_ids)
+
+                    if len(events_to_insert) + len(comments_to_insert) >= BULK_INSERT_SIZE:
+                        insert_documents(events_to_insert, comments_to_insert)
+
+                # The next page is checked against the stored documents, therefore the page must be stored completely
+                insert_documents(events_to_insert, comments_to_insert)
+
+        if not found_issues:
             logger.info('No new issues found. Exiting...')
-            sys.exit(0)
 
-        # Otherwise, go through all issues
-        processed_results = 50
-        while len(issues) > 0:
-            logger.info("Processing %d issues..." % len(issues))
-            for issue in issues:
-                logger.info("Processing issue %s" % issue['id'])
-                self._process_issue(issue)
+    @staticmethod
+    def _is_unchanged(issue, mongo_issue):
+        """
+        Checks if the issue was not changed since it was stored
+
+        :param issue: issue that was got from the bugzilla REST API
+        :param mongo_issue: stored issue or None, if the issue is not stored yet
+        """
+        if mongo_issue is None or mongo_issue.updated_at is None:
+            return False
+
+        return as_utc(mongo_issue.updated_at) == as_utc(parse_date(issue['last_change_time']))
+
+    def _get_issue_details(self, issue):
+        """
+        Gets the comments and the history of an issue
+
+        :param issue: issue that was got from the bugzilla REST API
+        :return: tuple of the comments and the histories of the issue
+        """
+        return self.bugzilla_agent.get_comments(issue['id']), self.bugzilla_agent.get_issue_history(issue['id'])
+
+    def _get_stored_documents(self, issues):
+        """
+        Gets the stored issues of a page of issues together with the external ids of their stored events and comments.
+        Instead of one query per issue, event, and comment, only three queries are needed per page. The queries use the
+        indexes of :func:`~issueshark.backends.helpers.storage.create_indexes`. Issues that are not stored yet are
+        created with an id here, so that neither they nor their events and comments need to be looked up and links to
+        them can be resolved before they are saved
 
-            # Go through the next issues
-            issues = self.bugzilla_agent.get_bug_list(last_change_time=starting_date, limit=50, offset=processed_results)
-            processed_results += 50
+        :param issues: issues that were got from the bugzilla REST API
+        :return: tuple of a dictionary external id -> :class:`~pycoshark.mongomodels.Issue` and two dictionaries that \
+        map the id of each issue to the set of external ids of its stored events and comments
+        """
+        external_ids = [str(issue['id']) for issue in issues]
+        stored_issues = {mongo_issue.external_id: mongo_issue for mongo_issue in
+                         Issue.objects(issue_system_id=self.issue_system_id, external_id__in=external_ids)
+                         .only(*self._get_issue_fields())}
+        issue_ids = [mongo_issue.id for mongo_issue in stored_issues.values()]
+
+        stored_event_ids = {issue_id: set() for issue_id in issue_ids}
+        for issue_id, external_id in Event.objects(issue_id__in=issue_ids).scalar('issue_id', 'external_id'):
+            stored_event_ids[issue_id].add(external_id)
+
+        stored_comment_ids = {issue_id: set() for issue_id in issue_ids}
+        for issue_id, external_id in IssueComment.objects(issue_id__in=issue_ids).scalar('issue_id', 'external_id'):
+            stored_comment_ids[issue_id].add(external_id)
 
-    def _process_issue(self, issue):
+        for external_id in external_ids:
+            if external_id not in stored_issues:
+                mongo_issue = Issue(id=ObjectId(), issue_system_id=self.issue_system_id, external_id=external_id)
+                stored_issues[external_id] = mongo_issue
+                stored_event_ids[mongo_issue.id] = set()
+                stored_comment_ids[mongo_issue.id] = set()
+                self.issue_id_cache[external_id] = mongo_issue.id
+
+        return stored_issues, stored_event_ids, stored_comment_ids
+
+    def _process_issue(self, issue, comments, histories, events_to_insert, comments_to_insert, stored_issues=None,
+                       stored_event_ids=None, stored_comment_ids=None):
         """
         Processes the issue in several steps:
 
-        1. Get all comments. See: :func:`issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_comments`
+        1. Transforms the issue to our issue model. \
+        See: :func:`issueshark.backends.bugzilla_old.BugzillaBackend._transform_issue`
 
-        2. Get the whole issue history.\
-        See: :func:`issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_issue_history`
+        2. Go through the history of the issue (newest to oldes) and set back the issue step by step. During this \
+        processing: Create the events. See: :func:`issueshark.backends.bugzilla_old.BugzillaBackend._process_event`
 
-        3. Transforms the issue to our issue model. \
-        See: :func:`issueshark.backends.bugzilla.BugzillaBackend._transform_issue`
+        3. Store the issue in its original version
 
-        4. Go through the history of the issue (newest to oldes) and set back the issue step by step. During this \
-        processing: Store the events. See: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_event`
+        4. Process all comments. See: :func:`issueshark.backends.bugzilla_old.BugzillaBackend._process_comments`
 
-        5. Process all comments. See: :func:`issueshark.backends.bugzilla.BugzillaBackend._process_comments`
+        New events and comments are only collected in the given lists, the caller inserts them, see \
+        :func:`~issueshark.backends.helpers.storage.insert_documents`
 
         :param issue: issue that was got from the bugzilla REST API
+        :param comments: comments of the issue, \
+        see :func:`~issueshark.backends.bugzilla_old.BugzillaBackend._get_issue_details`
+        :param histories: history of the issue
+        :param events_to_insert: list to which new events are appended
+        :param comments_to_insert: list to which new comments are appended
+        :param stored_issues: if given, dictionary of the stored issues of the page. \
+        See: :func:`issueshark.backends.bugzilla_old.BugzillaBackend._get_stored_documents`
+        :param stored_event_ids: if given, dictionary of the external ids of the stored events per issue
+        :param stored_comment_ids: if given, dictionary of the external ids of the stored comments per issue
         """
         # Transform issue
-        comments = self.bugzilla_agent.get_comments(issue['id'])
-        histories = self.bugzilla_agent.get_issue_history(issue['id'])
-        mongo_issue = self._transform_issue(issue, comments)
+        self._prefetch_users(issue, histories, comments)
+        self._prefetch_issue_ids(self._get_linked_system_ids([], histories))
+        if stored_issues is not None:
+            mongo_issue = self._transform_issue(issue, comments, stored_issues.get(str(issue['id'])))
+        else:
+            mongo_issue = self._transform_issue(issue, comments)
+
+        # Issues that were not prefetched are looked up one by one
+        if stored_event_ids is None or mongo_issue.id not in stored_event_ids:
+            issue_event_ids = set(Event.objects(issue_id=mongo_issue.id).scalar('external_id'))
+        else:
+            issue_event_ids = stored_event_ids[mongo_issue.id]
 
         logger.debug('Transformed issue: %s', mongo_issue)
 
@@ -132,17 +294,19 @@ class BugzillaBackend(BaseBackend):
         # 1) Set back issue
         # 2) Store events
         j = 0
-        events_to_insert = []
+        prefix = str(issue['id']) + "%%"
         for history in reversed(histories):
             i = 0
-            change_date = dateutil.parser.parse(history['when'])
+            suffix = "%%" + str(j)
+            change_date = parse_date(history['when'])
             author_id = self._get_people(history['who'])
             for bz_event in history['changes']:
-                logger.debug("Processing event: %s" % bz_event)
-                unique_event_id = str(issue['id'])+"%%"+str(i)+"%%"+str(j)
-                mongo_event, is_new_event = self._process_event(unique_event_id, bz_event, mongo_issue, change_date,
-                                                                author_id)
-                logger.debug('Newly created?: %s, Resulting event: %s' % (is_new_event, mongo_event))
+                logger.debug("Processing event: %s", bz_event)
+                unique_event_id = prefix + str(i) + suffix
+                is_new_event = unique_event_id not in issue_event_ids
+                mongo_event = self._process_event(unique_event_id, bz_event, mongo_issue, change_date, author_id,
+                                                  is_new_event)
+                logger.debug('Newly created?: %s, Resulting event: %s', is_new_event, mongo_event)
 
                 # Append to list if event is not stored in db
                 if is_new_event:
@@ -151,27 +315,33 @@ class BugzillaBackend(BaseBackend):
                 i += 1
             j += 1
 
-        # Update issue to the original version
+        # Store the issue in its original version
         mongo_issue.save()
 
-        # Store events
-        if events_to_insert:
-            Event.objects.insert(events_to_insert, load_bulk=False)
-
-        # Store comments
-        self._process_comments(mongo_issue.id, comments)
+        # Process comments
+        if stored_comment_ids is None:
+            self._process_comments(mongo_issue.id, comments, comments_to_insert)
+        else:
+            self._process_comments(mongo_issue.id, comments, comments_to_insert,
+                                   stored_comment_ids.get(mongo_issue.id))
 
-    def _process_comments(self, mongo_issue_id, comments):
+    def _process_comments(self, mongo_issue_id, comments, comments_to_insert, stored_comment_ids=None):
         """
         Processes the comments for an issue
 
         :param mongo_issue_id: Object of class :class:`bson.objectid.ObjectId`. Identifier of the document that holds
         the issue information
         :param comments: comments that were received from the bugzilla API
+        :param comments_to_insert: list to which new comments are appended, the caller needs to insert them
+        :param stored_comment_ids: set of the external ids of the stored comments of the issue. If not given, they \
+        are queried
         """
+        if stored_comment_ids is None:
+            stored_comment_ids = set(IssueComment.objects(issue_id=mongo_issue_id).scalar('external_id'))
+
         # Go through all comments of the issue
-        comments_to_insert = []
         logger.info('Processing %d comments...' % (len(comments)-1))
+        prefix = "%s%%" % mongo_issue_id
         i = -1
         for comment in comments:
             # Comment with count 0 is the description of the bug
@@ -179,49 +349,35 @@ class BugzillaBackend(BaseBackend):
                 continue
 
             i += 1
-            logger.debug('Processing comment: %s' % comment)
-            unique_comment_id = "%s%%%s" % (mongo_issue_id, i)
-            try:
-                IssueComment.objects(external_id=unique_comment_id, issue_id=mongo_issue_id).get()
+            logger.debug('Processing comment: %s', comment)
+            unique_comment_id = prefix + str(i)
+            if unique_comment_id in stored_comment_ids:
                 continue
-            except DoesNotExist:
-                mongo_comment = IssueComment(
-                    external_id=unique_comment_id,
-                    issue_id=mongo_issue_id,
-                    created_at=dateutil.parser.parse(comment['creation_time']),
-                    author_id=self._get_people(comment['creator']),
-                    comment=comment['text'],
-                )
-                logger.debug('Resulting comment: %s' % mongo_comment)
-                comments_to_insert.append(mongo_comment)
 
-        # If comments need to be inserted -> bulk insert
-        if comments_to_insert:
-            IssueComment.objects.insert(comments_to_insert, load_bulk=False)
+            mongo_comment = IssueComment(
+                external_id=unique_comment_id,
+                issue_id=mongo_issue_id,
+                created_at=parse_date(comment['creation_time']),
+                author_id=self._get_people(comment['creator']),
+                comment=comment['text'],
+            )
+            logger.debug('Resulting comment: %s', mongo_comment)
+            comments_to_insert.append(mongo_comment)
 
-    def _process_event(self, unique_event_id, bz_event, mongo_issue, change_date, author_id):
+    def _process_event(self, unique_event_id, bz_event, mongo_issue, change_date, author_id, is_new_event=True):
         """
         Processes the event. During the event processing the Issue is set back to its original state
-        before the event occured.
+        before the event occured. The event is created, but not stored in the database
 
         :param unique_event_id: unique identifier of the event
         :param bz_event: event that was received from the bugzilla API
         :param mongo_issue: issue that is/should be stored in the mongodb
         :param change_date: date when the event was created
         :param author_id: :class:`bson.objectid.ObjectId` of the author of the event
+        :param is_new_event: if False, the event is already stored. Then, only the issue is set back and no event is \
+        created
+        :return: the created event or None, if the event is already stored
         """
-        is_new_event = True
-        try:
-            mongo_event = Event.objects(external_id=unique_event_id, issue_id=mongo_issue.id).get()
-            is_new_event = False
-        except DoesNotExist:
-            mongo_event = Event(
-                external_id=unique_event_id,
-                issue_id=mongo_issue.id,
-                created_at=change_date,
-                author_id=author_id
-            )
-
         # We need to map back the status from the bz terminology to ours. Special: The assigned_to must be mapped to
         # assigned_to_detail beforehand, as we are using this for the issue parsing
         if bz_event['field_name'] == 'assigned_to':
@@ -230,23 +386,52 @@ class BugzillaBackend(BaseBackend):
             bz_at_name = bz_event['field_name']
 
         try:
-            mongo_event.status = self.at_mapping[bz_at_name]
+            status = self.at_mapping[bz_at_name]
         except KeyError:
             logger.warning('Mapping for attribute %s not found.' % bz_at_name)
-            mongo_event.status = bz_at_name
-
-        # Check if the mongo_issue has the attribute.
+            status = bz_at_name
+
+        # Stored events are not changed, but the issue must still be set back for the events before them
+        if not is_new_event:
+            if status in self.issue_fields:
+                self._set_back_mongo_issue(mongo_issue, status, bz_event)
+            return None
+
+        mongo_event = Event(
+            external_id=unique_event_id,
+            issue_id=mongo_issue.id,
+            created_at=change_date,
+            author_id=author_id,
+            status=status
+        )
+
+        # Check if the mongo_issue has a field for the attribute.
         # If yes: We can use the mongo_issue to set the old and new value of the event
         # If no: We use the added / removed fields
-        if hasattr(mongo_issue, mongo_event.status):
-            mongo_event.new_value = copy.deepcopy(getattr(mongo_issue, mongo_event.status))
+        if mongo_event.status in self.issue_fields:
+            mongo_event.new_value = self._snapshot(getattr(mongo_issue, mongo_event.status))
             self._set_back_mongo_issue(mongo_issue, mongo_event.status, bz_event)
-            mongo_event.old_value = copy.deepcopy(getattr(mongo_issue, mongo_event.status))
+            mongo_event.old_value = self._snapshot(getattr(mongo_issue, mongo_event.status))
         else:
             mongo_event.new_value = bz_event['added']
             mongo_event.old_value = bz_event['removed']
 
-        return mongo_event, is_new_event
+        return mongo_event
+
+    @staticmethod
+    def _snapshot(value):
+        """
+        Copies the value of an issue field, so that it is not changed when the issue is set back. Only lists are
+        changed in place (see :func:`~issueshark.backends.bugzilla_old.BugzillaBackend._set_back_array_field`), all
+        other values are replaced. Therefore, a shallow copy is enough
+
+        :param value: value of the field of the issue document
+        """
+        if isinstance(value, list):
+            return [dict(item) if isinstance(item, dict) else item for item in value]
+        if isinstance(value, dict):
+            return dict(value)
+        return value
 
     def _set_back_mongo_issue(self, mongo_issue, mongo_at_name, bz_event):
         """
@@ -256,22 +441,7 @@ class BugzillaBackend(BaseBackend):
         :param mongo_at_name: attribute name of the field of the issue document
         :param bz_event: event from the bugzilla api
         """
-        function_mapping = {
-            'title': self._set_back_string_field,
-            'priority': self._set_back_priority,
-            'status': self._set_back_string_field,
-            'affects_versions': self._set_back_array_field,
-            'components': self._set_back_array_field,
-            'labels': self._set_back_array_field,
-            'resolution': self._set_back_string_field,
-            'fix_versions': self._set_back_array_field,
-            'assignee_id': self._set_back_assignee,
-            'issue_links': self._set_back_issue_links,
-            'environment': self._set_back_string_field,
-            'platform': self._set_back_string_field
-        }
-
-        correct_function = function_mapping[mongo_at_name]
+        correct_function = self.function_mapping[mongo_at_name]
         correct_function(mongo_issue, mongo_at_name, bz_event)
 
     def _set_back_priority(self, mongo_issue, mongo_at_name, bz_event):
@@ -297,37 +467,38 @@ class BugzillaBackend(BaseBackend):
         :param mongo_at_name: attribute name of the field of the issue document
         :param bz_event: event from the bugzilla api
         """
-        type_mapping = {
-            'blocks': 'Blocker',
-            'dupe_of': 'Duplicate',
-            'depends_on': 'Dependent',
-        }
-
         item_list = getattr(mongo_issue, mongo_at_name)
 
         # Everything that is in "removed" must be added
         if bz_event['removed']:
             issue_id = self._get_issue_id_by_system_id(bz_event['removed'])
-            if issue_id not in [entry['issue_id'] for entry in item_list]:
-                item_list.append({'issue_id': issue_id, 'type': type_mapping[bz_event['field_name']],
+            if self._find_issue_link(item_list, issue_id) is None:
+                item_list.append({'issue_id': issue_id, 'type': self.link_type_mapping[bz_event['field_name']],
                                   'effect': bz_event['field_name']})
 
         # Everything that is in "added" must be removed
         if bz_event['added']:
             issue_id = self._get_issue_id_by_system_id(bz_event['added'])
-            found_index = 0
-            for stored_issue in item_list:
-                if stored_issue['issue_id'] == issue_id:
-                    break
-                found_index += 1
-            try:
+            found_index = self._find_issue_link(item_list, issue_id)
+            if found_index is not None:
                 del item_list[found_index]
-            except IndexError:
+            else:
                 logger.warning('Could not process event %s completely. Did not found issue to delete Issue %s' %
                                (bz_event, mongo_issue))
 
         setattr(mongo_issue, mongo_at_name, item_list)
 
+    @staticmethod
+    def _find_issue_link(item_list, issue_id):
+        """
+        Finds the link to an issue with one pass over the links and without building intermediate lists
+
+        :param item_list: issue links of the issue
+        :param issue_id: :class:`bson.objectid.ObjectId` of the linked issue
+        :return: index of the link in the list or None, if there is no link to the issue
+        """
+        return next((index for index, entry in enumerate(item_list) if entry['issue_id'] == issue_id), None)
+
     def _set_back_assignee(self, mongo_issue, mongo_at_name, bz_event):
         """
         Sets back the assignee of the issue before the event
@@ -375,36 +546,6 @@ class BugzillaBackend(BaseBackend):
 
         setattr(mongo_issue, mongo_at_name, item_list)
 
-    def _parse_bz_field(self, bz_issue, at_name_bz):
-        """
-        Parses fields from the bugzilla issue
-
-        :param bz_issue: bugzilla issue (returned by the API)
-        :param at_name_bz: attribute name that should be parsed
-        """
-        field_mapping = {
-            'assigned_to_detail': self._parse_author_details,
-            'blocks': self._parse_issue_links,
-            'component': self._parse_string_field,
-            'creation_time': self._parse_date_field,
-            'creator_detail': self._parse_author_details,
-            'depends_on': self._parse_issue_links,
-            'dupe_of': self._parse_issue_links,
-            'keywords': self._parse_array_field,
-            'last_change_time': self._parse_date_field,
-            'op_sys': self._parse_string_field,
-            'platform': self._parse_string_field,
-            'resolution': self._parse_string_field,
-            'severity': self._parse_string_field,
-            'status': self._parse_string_field,
-            'summary': self._parse_string_field,
-            'target_milestone': self._parse_string_field,
-            'version': self._parse_string_field,
-        }
-
-        correct_function = field_mapping.get(at_name_bz)
-        return correct_function(bz_issue, at_name_bz)
-
     def _parse_author_details(self, bz_issue, at_name_bz):
         """
         Parses author details from the bugzilla issue
@@ -443,25 +584,19 @@ class BugzillaBackend(BaseBackend):
         :param bz_issue: bugzilla issue (returned by the API)
         :param at_name_bz: attribute name that should be parsed
         """
-        type_mapping = {
-            'blocks': 'Blocker',
-            'dupe_of': 'Duplicate',
-            'depends_on': 'Dependent',
-        }
-
         issue_links = []
         if isinstance(bz_issue[at_name_bz], list):
             for link in bz_issue[at_name_bz]:
                 issue_links.append({
                     'issue_id': self._get_issue_id_by_system_id(link),
-                    'type': type_mapping[at_name_bz],
+                    'type': self.link_type_mapping[at_name_bz],
                     'effect': at_name_bz
                 })
         else:
             if bz_issue[at_name_bz] is not None:
                 issue_links.append({
                     'issue_id': self._get_issue_id_by_system_id(bz_issue[at_name_bz]),
-                    'type': type_mapping[at_name_bz],
+                    'type': self.link_type_mapping[at_name_bz],
                     'effect': at_name_bz
                 })
 
@@ -474,51 +609,55 @@ class BugzillaBackend(BaseBackend):
         :param bz_issue: bugzilla issue (returned by the API)
         :param at_name_bz: attribute name that should be parsed
         """
-        return dateutil.parser.parse(bz_issue[at_name_bz])
+        return parse_date(bz_issue[at_name_bz])
 
-    def _transform_issue(self, bz_issue, bz_comments):
+    def _transform_issue(self, bz_issue, bz_comments, mongo_issue=None):
         """
         Transforms the issue from an bugzilla issue to our issue model
 
         :param bz_issue: bugzilla issue (returned by the API)
         :param bz_comments: comments to the bugzilla issue (as the first comment is the description of the issue)
-        :return:
+        :param mongo_issue: stored issue that should be updated. If not given, it is queried
+        :return: transformed issue. It is not saved, new issues get their id assigned, so that events and comments \
+        can reference them before the issue is saved
         """
-        try:
-            mongo_issue = Issue.objects(issue_system_id=self.issue_system_id, external_id=str(bz_issue['id'])).get()
-        except DoesNotExist:
-            mongo_issue = Issue(
-                issue_system_id=self.issue_system_id,
-                external_id=str(bz_issue['id'])
-            )
+        if mongo_issue is None:
+            try:
+                mongo_issue = Issue.objects(issue_system_id=self.issue_system_id, external_id=str(bz_issue['id']))\
+                    .only(*self._get_issue_fields()).get()
+            except DoesNotExist:
+                mongo_issue = Issue(
+                    id=ObjectId(),
+                    issue_system_id=self.issue_system_id,
+                    external_id=str(bz_issue['id'])
+                )
 
-        # Set fields that can be directly mapped
-        for at_name_bz, at_name_mongo in self.at_mapping.items():
-            if isinstance(getattr(mongo_issue, at_name_mongo), list):
-                # Get the result and the current value and merge it together
-                result = self._parse_bz_field(bz_issue, at_name_bz)
-                current_value = getattr(mongo_issue, at_name_mongo, list())
-                if not isinstance(result, list):
-                    result = [result]
-
-                # Extend
-                current_value.extend(result)
-                if len(current_value) > 0 and at_name_mongo == 'issue_links':
-                    current_value = list({v['issue_id']: v for v in current_value}.values())
-                else:
-                    current_value = list(set(current_value))
-
-                # Set the attribute
-                setattr(mongo_issue, at_name_mongo, copy.deepcopy(current_value))
+        # Set fields that can be directly mapped. Several bugzilla attributes can be merged into the same list (e.g.,
+        # issue_links). Therefore, the values for lists are collected first and merged with the current value only
+        # once per list
+        for at_name_bz, at_name_mongo, parse_function in self.scalar_fields:
+            setattr(mongo_issue, at_name_mongo, parse_function(bz_issue, at_name_bz))
+
+        new_values = {}
+        for at_name_bz, at_name_mongo, parse_function in self.list_fields:
+            result = parse_function(bz_issue, at_name_bz)
+            if not isinstance(result, list):
+                result = [result]
+            new_values.setdefault(at_name_mongo, []).extend(result)
+
+        for at_name_mongo, values in new_values.items():
+            merged_values = itertools.chain(getattr(mongo_issue, at_name_mongo), values)
+            if at_name_mongo == 'issue_links':
+                current_value = list({v['issue_id']: v for v in merged_values}.values())
             else:
-                setattr(mongo_issue, at_name_mongo, self._parse_bz_field(bz_issue, at_name_bz))
+                current_value = list(dict.fromkeys(merged_values))
+            setattr(mongo_issue, at_name_mongo, current_value)
 
         # The first comment is the description! Bugzilla does not have a separate description field. The comment
         # with the count == 0 is the description
-        for comment in bz_comments:
-            if comment['count'] == 0:
-                mongo_issue.desc = comment['text']
-                break
+        description = next((comment for comment in bz_comments if comment['count'] == 0), None)
+        if description is not None:
+            mongo_issue.desc = description['text']
 
         # Bugzilla does not have a separate field for the type. Therefore, we distinguish between bug an enhancement
         # based on the severity information
@@ -527,7 +666,15 @@ class BugzillaBackend(BaseBackend):
         else:
             mongo_issue.issue_type = 'Bug'
 
-        return mongo_issue.save()
+        return mongo_issue
+
+    def _get_issue_fields(self):
+        """
+        Gets the fields of the issue document that are needed to update a stored issue. All other fields are either
+        overwritten or not touched by this backend. As the issue is saved with the changed fields only, they do not
+        need to be loaded
+        """
+        return ('id', 'issue_system_id', 'external_id') + tuple(set(self.at_mapping.values()))
 
     def _get_mongo_attribute(self, field_name):
         """
@@ -537,6 +684,69 @@ class BugzillaBackend(BaseBackend):
         """
         return self.at_mapping[field_name]
 
+    def _prefetch_users(self, bz_issue, histories, comments):
+        """
+        Gets the details of all unknown users of an issue with one request, so that
+        :func:`~issueshark.backends.bugzilla_old.BugzillaBackend._get_people` does not need to request them one by one.
+        These are the assignee and creator (if the issue does not contain their details), the authors of the histories
+        and comments, and the users of assignee changes
+
+        :param bz_issue: bugzilla issue (returned by the API)
+        :param histories: histories of the issue (returned by the API)
+        :param comments: comments of the issue (returned by the API)
+        """
+        usernames = set()
+        for at_name_bz in ('assigned_to_detail', 'creator_detail'):
+            if 'email' not in bz_issue[at_name_bz]:
+                usernames.add(bz_issue[at_name_bz]['name'])
+
+        for history in histories:
+            usernames.add(history['who'])
+            for bz_event in history['changes']:
+                if bz_event['field_name'] == 'assigned_to':
+                    usernames.update(username for username in (bz_event['added'], bz_event['removed']) if username)
+
+        # The comment with count 0 is the description, its author is not stored
+        usernames.update(comment['creator'] for comment in comments if comment['count'] != 0)
+        unknown_usernames = [username for username in usernames if username not in self.people]
+
+        if not unknown_usernames:
+            return
+
+        people = []
+        for user in self.bugzilla_agent.get_users(sorted(unknown_usernames)):
+            name, email = self._get_name_and_email(user['name'], user)
+            people.append((user['name'], name, email, user['name']))
+        self.people.update(store_people(people))
+
+    @staticmethod
+    def _get_name_and_email(username, user):
+        """
+        Gets the name and the email address of a user
+
+        :param username: username of the user
+        :param user: user like it is returned by the bugzilla API or None, if the user was not found
+        :return: tuple of name and email address
+        """
+        # If the user is not found, we must use the username name
+        if user is None:
+            email = None
+            name = username
+        else:
+            email = user['email']
+            name = user['real_name']
+
+        # Check if email is none, this can happen as an email address may be excluded from the return value
+        if email is None:
+            # Check if the username is a valid email address, if yes use this
+            if '@' in username and EMAIL_REGEX.match(username):
+                email = username
+            else:
+                email = "nobody@nobody.com"
+
+        # Replace the email address "anonymization"
+        return name, email.replace(' at ', '@').replace(' dot ', '.')
+
     def _get_people(self, username, email=None, name=None):
         """
         Gets people from the people collection
@@ -551,39 +761,87 @@ class BugzillaBackend(BaseBackend):
 
         # If email and name are not set, make a request to get the user
         if email is None and name is None:
-            user = self.bugzilla_agent.get_user(username)
-
-            # If the user is not found, we must use the username name
-            if user is None:
-                email = None
-                name = username
-            else:
-                email = user['email']
-                name = user['real_name']
-
-            # Check if email is none, this can happen as an email address may be excluded from the return value
-            if email is None:
-                # Check if the username is a valid email address, if yes use this
-                if validate_email(username):
-                    email = username
-                else:
-                    email = "nobody@nobody.com"
+            name, email = self._get_name_and_email(username, self.bugzilla_agent.get_user(username))
+        else:
+            # Replace the email address "anonymization"
+            email = email.replace(' at ', '@').replace(' dot ', '.')
 
-        # Replace the email address "anonymization"
-        email = email.replace(' at ', '@').replace(' dot ', '.')
         people_id = People.objects(name=name, email=email).upsert_one(name=name, email=email, username=username).id
         self.people[username] = people_id
         return people_id
 
+    @staticmethod
+    def _get_linked_system_ids(bz_issues, histories):
+        """
+        Gets the ids of all issues that are linked by the given issues or by link changes in the given histories
+
+        :param bz_issues: bugzilla issues (returned by the API)
+        :param histories: histories of an issue (returned by the API)
+        :return: set of the ids of the linked issues in the bugzilla ITS
+        """
+        system_ids = set()
+        for bz_issue in bz_issues:
+            for at_name_bz in LINK_FIELDS:
+                if isinstance(bz_issue[at_name_bz], list):
+                    system_ids.update(bz_issue[at_name_bz])
+                elif bz_issue[at_name_bz] is not None:
+                    system_ids.add(bz_issue[at_name_bz])
+
+        for history in histories:
+            for bz_event in history['changes']:
+                if bz_event['field_name'] in LINK_FIELDS:
+                    system_ids.update(system_id for system_id in (bz_event['added'], bz_event['removed']) if system_id)
+
+        return system_ids
+
+    def _prefetch_issue_ids(self, system_ids):
+        """
+        Puts the ids of the given issues into the issue id cache. Stored issues are got with one query, all other
+        issues are created (with only their external id) with one bulk write
+
+        :param system_ids: ids of the issues in the bugzilla ITS
+        """
+        external_ids = {str(system_id) for system_id in system_ids} - self.issue_id_cache.keys()
+        if not external_ids:
+            return
+
+        collection = Issue._get_collection()
+        for document in collection.find({'issue_system_id': self.issue_system_id,
+                                         'external_id': {'$in': list(external_ids)}}, {'external_id': 1}):
+            self.issue_id_cache[document['external_id']] = document['_id']
+
+        missing_external_ids = [external_id for external_id in external_ids if external_id not in self.issue_id_cache]
+        if not missing_external_ids:
+            return
+
+        operations = []
+        for external_id in missing_external_ids:
+            # The fields of the filter are set on insert anyway, the remaining fields are the defaults of the model
+            document = Issue(issue_system_id=self.issue_system_id, external_id=external_id).to_mongo()
+            del document['issue_system_id']
+            del document['external_id']
+            operations.append(UpdateOne({'issue_system_id': self.issue_system_id, 'external_id': external_id},
+                                        {'$setOnInsert': document}, upsert=True))
+        result = collection.bulk_write(operations, ordered=False)
+
+        # Issues that were created concurrently are not upserted, they are looked up on their first use
+        for index, issue_id in result.upserted_ids.items():
+            self.issue_id_cache[missing_external_ids[index]] = issue_id
+
     def _get_issue_id_by_system_id(self, system_id):
         """
         Gets the issue by their id that was assigned by the bugzilla ITS
 
         :param system_id: id of the issue in the bugzilla ITS
         """
+        external_id = str(system_id)
+        if external_id in self.issue_id_cache:
+            return self.issue_id_cache[external_id]
+
         try:
-            issue_id = Issue.objects(issue_system_id=self.issue_system_id, external_id=str(system_id)).only('id').get().id
+            issue_id = Issue.objects(issue_system_id=self.issue_system_id, external_id=external_id).only('id').get().id
         except DoesNotExist:
-            issue_id = Issue(issue_system_id=self.issue_system_id, external_id=str(system_id)).save().id
+            issue_id = Issue(issue_system_id=self.issue_system_id, external_id=external_id).save().id
 
+        self.issue_id_cache[external_id] = issue_id
         return issue_id
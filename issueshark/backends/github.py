@@ -1,17 +1,20 @@
 import time
 
 import sys
-import datetime
 import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from bson import ObjectId
 from mongoengine import DoesNotExist
 from requests import RequestException
 from requests.auth import HTTPBasicAuth
 
 from issueshark.backends.basebackend import BaseBackend
+from issueshark.backends.helpers.parsing import as_utc, parse_date, parse_response
+from issueshark.backends.helpers.storage import insert_documents, store_people, upsert_issues
 import logging
 import requests
-import dateutil.parser
 
 from pycoshark.mongomodels import *
 
@@ -19,6 +22,7 @@ logger = logging.getLogger('backend')
 STATE_ALL = 'all'
 STATE_CLOSED = 'closed'
 STATE_OPEN = 'open'
+ISSUE_DETAIL_WORKERS = 8
 
 
 class GitHubAPIError(Exception):
@@ -32,12 +36,8 @@ class GithubBackend(BaseBackend):
     """
     Backend that collects issue from github
     """
-    @property
-    def identifier(self):
-        """
-        Identifier of the backend (github)
-        """
-        return 'github'
+    #: Identifier of the backend (github)
+    identifier = 'github'
 
     def __init__(self, cfg, issue_system_id, project_id):
         """
@@ -54,17 +54,42 @@ class GithubBackend(BaseBackend):
         logger.setLevel(self.debug_level)
         self.people = {}
 
+        # Functions that set the old and new value of an event, by the type of the event. See:
+        # :func:`~issueshark.backends.github.GithubBackend._set_old_and_new_value_for_event`
+        self.event_mapping = {
+            'assigned': self._set_assigned_value,
+            'unassigned': self._set_unassigned_value,
+            'labeled': self._set_labeled_value,
+            'unlabeled': self._set_unlabeled_value,
+            'milestoned': self._set_milestoned_value,
+            'demilestoned': self._set_demilestoned_value,
+            'renamed': self._set_renamed_values,
+        }
+
+        # Rate limit of the github API like it was reported by the last response. It is shared by all threads that
+        # send requests, see: :func:`~issueshark.backends.github.GithubBackend._wait_for_rate_limit`
+        self.rate_limit_lock = threading.Lock()
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+
     def process(self):
         """
         Processes the issues from github
 
         1. Gets the updated_at value of the last issue that was stored (newest updated issue)
 
-        2. Gets issues since this date
+        2. Gets issues since this date page by page, see \
+        :func:`~issueshark.backends.github.GithubBackend._get_issue_pages`
+
+        3. Requests the comments and events of the issues of a page concurrently, see \
+        :func:`~issueshark.backends.github.GithubBackend._get_issue_details`
+
+        4. Gets the people of the page that are not known yet, see \
+        :func:`~issueshark.backends.github.GithubBackend._prefetch_people`
 
-        3. Calls for each issue :func:`~issueshark.backends.github.GithubBackend.store_issue`
+        5. Calls for each issue :func:`~issueshark.backends.github.GithubBackend.store_issue`
 
-        4. Raises the page counter
+        6. Writes the issues, events, and comments of the page in bulk
         """
         logger.info("Starting the collection process...")
 
@@ -74,51 +99,146 @@ class GithubBackend(BaseBackend):
         if last_issue is not None:
             starting_date = last_issue.updated_at
 
-        # Get all issues
-        issues = self.get_issues(start_date=starting_date)
+        # Go through all issues (and all pages). The next page is requested while the current one is processed.
+        # Comments and events of the whole page are requested concurrently, while the issues are processed one after
+        # another in the order of the page. The issues, events, and comments of a page are written in bulk
+        found_issues = False
+        issues_to_upsert = []
+        events_to_insert = []
+        comments_to_insert = []
+        with ThreadPoolExecutor(max_workers=ISSUE_DETAIL_WORKERS) as executor:
+            for issues in self._get_issue_pages(starting_date):
+                found_issues = True
+                details = list(executor.map(self._get_issue_details, issues))
+                self._prefetch_people(issues, details, starting_date, executor)
+                stored_issues = self._get_stored_issues(issues)
+                for issue, (comments, events) in zip(issues, details):
+                    mongo_issue = self.store_issue(issue, issues_to_upsert, stored_issues)
+                    self._process_comments(mongo_issue, comments, comments_to_insert)
+                    self._process_events(mongo_issue, events, events_to_insert)
+
+                # The issues are written after their events, as the events set them back. Everything is written
+                # before the next page, as the stored events and comments are checked for it
+                upsert_issues(issues_to_upsert)
+                insert_documents(events_to_insert, comments_to_insert)
 
         # If no new bugs found, return
-        if len(issues) == 0:
+        if not found_issues:
             logger.info('No new issues found. Exiting...')
             sys.exit(0)
 
-        # Otherwise, go through all issues (and all pages)
-        page_number = 1
-        while len(issues) > 0:
-            for issue in issues:
-                mongo_issue = self.store_issue(issue)
-                self._process_comments(str(issue['number']), mongo_issue)
-                self._process_events(str(issue['number']), mongo_issue)
-            page_number += 1
-            issues = self.get_issues(pagecount=page_number, start_date=starting_date)
+    def _get_issue_pages(self, starting_date):
+        """
+        Yields the issues page by page until an empty page is returned. The next page is requested while the current
+        page is processed
 
-    def store_issue(self, raw_issue):
+        :param starting_date: only issues that were updated since this date are returned
+        """
+        page_number = 1
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(self.get_issues, pagecount=page_number, start_date=starting_date)
+            while True:
+                issues = next_page.result()
+                if len(issues) == 0:
+                    return
+
+                page_number += 1
+                next_page = executor.submit(self.get_issues, pagecount=page_number, start_date=starting_date)
+                yield issues
+
+    def _get_issue_details(self, raw_issue):
         """
-        Transforms the issue from a github issue to our issue model
+        Gets the comments and the events of an issue. The comments are only requested if the issue has comments
 
-        1. Transforms the issue to our model
+        :param raw_issue: issue like we got it from github
+        :return: tuple of the comments and the events of the issue
+        """
+        system_id = str(raw_issue['number'])
+        comments = []
+        if raw_issue.get('comments', 1) > 0:
+            comments = self._send_request('%s/%s/comments' % (self.config.tracking_url, system_id))
+        events = self._send_request('%s/%s/events' % (self.config.tracking_url, system_id))
+        return comments, events
+
+    def _get_stored_issues(self, issues):
+        """
+        Gets the stored issues of a page with one query
 
-        2. Processes the comments of the issue. See: :func:`~issueshark.backends.github.GithubBackend._process_comments`
+        :param issues: issues of the page like we got them from github
+        :return: dictionary that maps the external id to the stored :class:`~pycoshark.mongomodels.Issue`
+        """
+        external_ids = [str(raw_issue['number']) for raw_issue in issues]
+        return {issue.external_id: issue for issue in
+                Issue.objects(issue_system_id=self.issue_system_id, external_id__in=external_ids)}
 
-        3. Processes the events of the issue. See: :func:`~issueshark.backends.github.GithubBackend._process_events`.
-        During this: set back the issue and store it again.
+    def _prefetch_people(self, issues, details, starting_date, executor):
+        """
+        Requests the users of a page that are not in the people dictionary concurrently and upserts them with one bulk
+        write. Users of events and comments that were created before the starting date are skipped, as these were
+        already stored by an earlier run. Users that are not prefetched are still handled by \
+        :func:`~issueshark.backends.github.GithubBackend._get_people`
+
+        :param issues: issues of the page like we got them from github
+        :param details: tuples of the comments and the events of the issues, see \
+        :func:`~issueshark.backends.github.GithubBackend._get_issue_details`
+        :param starting_date: updated_at value of the newest stored issue or None
+        :param executor: executor with which the users are requested
+        """
+        if starting_date is not None:
+            starting_date = as_utc(starting_date)
+
+        def is_new(raw_document):
+            return starting_date is None or parse_date(raw_document['created_at']) >= starting_date
+
+        user_urls = set()
+        for raw_issue, (comments, events) in zip(issues, details):
+            user_urls.add(raw_issue['user']['url'])
+            if raw_issue['assignee'] is not None:
+                user_urls.add(raw_issue['assignee']['url'])
+
+            for raw_comment in comments:
+                if is_new(raw_comment):
+                    user_urls.add(raw_comment['user']['url'])
+
+            for raw_event in events:
+                if not is_new(raw_event):
+                    continue
+                if raw_event.get('actor') is not None:
+                    user_urls.add(raw_event['actor']['url'])
+                if raw_event['event'] in ('assigned', 'unassigned') and raw_event.get('assignee') is not None:
+                    user_urls.add(raw_event['assignee']['url'])
+
+        user_urls = [user_url for user_url in user_urls if user_url not in self.people]
+        people = [(user_url,) + self._get_name_and_email(raw_user)
+                  for user_url, raw_user in zip(user_urls, executor.map(self._send_request, user_urls))]
+        self.people.update(store_people(people))
+
+    def store_issue(self, raw_issue, issues_to_upsert, stored_issues=None):
+        """
+        Transforms the issue from a github issue to our issue model. The issue is not written, the caller upserts it
+        after its events set it back, see :func:`~issueshark.backends.github.GithubBackend._process_events`
 
         :param raw_issue: like we got it from github
+        :param issues_to_upsert: list to which the validated issue is appended, the caller needs to upsert it, see \
+        :func:`~issueshark.backends.helpers.storage.upsert_issues`. New issues get their id assigned, so that events \
+        and comments can reference them before
+        :param stored_issues: if given, dictionary of the stored issues of the page, see \
+        :func:`~issueshark.backends.github.GithubBackend._get_stored_issues`. Otherwise, the issue is queried
         """
         logger.debug('Processing issue %s' % raw_issue)
-        updated_at = dateutil.parser.parse(raw_issue['updated_at'])
-        created_at = dateutil.parser.parse(raw_issue['created_at'])
-
-        try:
-            # We can not return here, as the issue might be updated. This means, that the title could be updated
-            # as well as comments and new events
-            issue = Issue.objects(issue_system_id=self.issue_system_id, external_id=str(raw_issue['number'])).get()
-        except DoesNotExist:
-            issue = Issue(issue_system_id=self.issue_system_id, external_id=str(raw_issue['number']))
+        updated_at = parse_date(raw_issue['updated_at'])
+        created_at = parse_date(raw_issue['created_at'])
+
+        # We can not return here, as the issue might be updated. This means, that the title could be updated
+        # as well as comments and new events
+        external_id = str(raw_issue['number'])
+        if stored_issues is None:
+            issue = Issue.objects(issue_system_id=self.issue_system_id, external_id=external_id).first()
+        else:
+            issue = stored_issues.get(external_id)
 
-        labels = []
-        for label in raw_issue['labels']:
-            labels.append(label['name'])
+        if issue is None:
+            issue = Issue(id=ObjectId(), issue_system_id=self.issue_system_id, external_id=external_id)
 
         issue.reporter_id = self._get_people(raw_issue['user']['url'])
         issue.creator_id = issue.reporter_id
@@ -127,42 +247,39 @@ class GithubBackend(BaseBackend):
         issue.updated_at = updated_at
         issue.created_at = created_at
         issue.status = raw_issue['state']
-        issue.labels = labels
+        issue.labels = [label['name'] for label in raw_issue['labels']]
         # github issues can be pull requests too (gitea is probably the same)
-        if 'pull_request' in raw_issue.keys():
+        if 'pull_request' in raw_issue:
             issue.is_pull_request = True
 
         if raw_issue['assignee'] is not None:
             issue.assignee_id = self._get_people(raw_issue['assignee']['url'])
 
-        return issue.save()
+        issue.validate()
+        issues_to_upsert.append(issue)
+        return issue
 
-    def _process_events(self, system_id, mongo_issue):
+    def _process_events(self, mongo_issue, events, events_to_insert):
         """
         Processes events of an issue.
 
-        Go through all events and store them. If it has a commit_id in it, directly link it to the VCS data. If the
-        event affects the stored issue data (e.g., rename) set back the issue to its original state.
+        Go through all events and create the new ones. If it has a commit_id in it, directly link it to the VCS data. If
+        the event affects the stored issue data (e.g., rename) set back the issue to its original state.
 
-        :param system_id: id of the issue like it is given from the github API
         :param mongo_issue: object of our issue model
+        :param events: events of the issue, see :func:`~issueshark.backends.github.GithubBackend._get_issue_details`
+        :param events_to_insert: list to which new events are appended. The caller needs to insert them and to upsert \
+        the issue, which was set back
         """
-        # Get all events to the corresponding issue
-        target_url = '%s/%s/events' % (self.config.tracking_url, system_id)
-        events = self._send_request(target_url)
-
         # Go through all events and create mongo objects from it
-        events_to_store = []
+        stored_event_ids = self._get_stored_external_ids(Event, mongo_issue, events)
         for raw_event in events:
-            created_at = dateutil.parser.parse(raw_event['created_at'])
-
             # If the event is already saved, we can just continue, because nothing will change on the event
-            try:
-                Event.objects(external_id=raw_event['id'], issue_id=mongo_issue.id).get()
+            if raw_event['id'] in stored_event_ids:
                 continue
-            except DoesNotExist:
-                event = Event(external_id=raw_event['id'],
-                              issue_id=mongo_issue.id, created_at=created_at, status=raw_event['event'])
+
+            event = Event(external_id=raw_event['id'], issue_id=mongo_issue.id,
+                          created_at=parse_date(raw_event['created_at']), status=raw_event['event'])
 
             if raw_event['commit_id'] is not None:
                 # It can happen that a commit from another repository references this issue. Therefore, we can not
@@ -176,90 +293,130 @@ class GithubBackend(BaseBackend):
                 except DoesNotExist:
                     pass
 
-            if 'actor' in raw_event and raw_event['actor'] is not None:
-                event.author_id = self._get_people(raw_event['actor']['url'])
+            actor = raw_event.get('actor')
+            if actor is not None:
+                event.author_id = self._get_people(actor['url'])
 
             self._set_old_and_new_value_for_event(event, raw_event, mongo_issue)
-            mongo_issue.save()
-
-            events_to_store.append(event)
-
-        # Bulk insert to database
-        if events_to_store:
-            Event.objects.insert(events_to_store, load_bulk=False)
+            events_to_insert.append(event)
 
     def _set_old_and_new_value_for_event(self, event, raw_event, mongo_issue):
         """
-        Sets the old and new value for an event to be stored
+        Sets the old and new value for an event to be stored. The function that sets the values is looked up in the
+        event mapping via the type of the event
 
         :param event: event conforming to our model
         :param raw_event: raw event like it is acquired from the github api
+        :param mongo_issue: object of our issue model
         """
+        set_function = self.event_mapping.get(raw_event['event'])
+        if set_function is not None:
+            set_function(event, raw_event, mongo_issue)
 
-        if raw_event['event'] == 'assigned':
-            if 'assignee' in raw_event and raw_event['assignee'] is not None:
-                event.new_value = self._get_people(raw_event['assignee']['url'])
-
+    def _set_assigned_value(self, event, raw_event, mongo_issue):
+        """
+        Sets the assigned person as new value of the event
+        """
+        assignee = raw_event.get('assignee')
+        if assignee is not None:
+            event.new_value = self._get_people(assignee['url'])
 
-            #if 'assigner' in raw_event and raw_event['assigner'] is not None:
-            #    event.assigner_id = self._get_people(raw_event['assigner']['url'])
+        #if 'assigner' in raw_event and raw_event['assigner'] is not None:
+        #    event.assigner_id = self._get_people(raw_event['assigner']['url'])
 
-        if raw_event['event'] == 'unassigned':
-            if 'assignee' in raw_event and raw_event['assignee'] is not None:
-                event.old_value = self._get_people(raw_event['assignee']['url'])
+    def _set_unassigned_value(self, event, raw_event, mongo_issue):
+        """
+        Sets the unassigned person as old value of the event
+        """
+        assignee = raw_event.get('assignee')
+        if assignee is not None:
+            event.old_value = self._get_people(assignee['url'])
 
-            #if 'assigner' in raw_event and raw_event['assigner'] is not None:
-            #    event.assigner_id = self._get_people(raw_event['assigner']['url'])
+        #if 'assigner' in raw_event and raw_event['assigner'] is not None:
+        #    event.assigner_id = self._get_people(raw_event['assigner']['url'])
 
-        if raw_event['event'] == 'labeled' and 'label' in raw_event:
+    @staticmethod
+    def _set_labeled_value(event, raw_event, mongo_issue):
+        """
+        Sets the added label as new value of the event
+        """
+        if 'label' in raw_event:
             event.new_value = raw_event['label']['name']
 
-        if raw_event['event'] == 'unlabeled' and 'label' in raw_event:
+    @staticmethod
+    def _set_unlabeled_value(event, raw_event, mongo_issue):
+        """
+        Sets the removed label as old value of the event
+        """
+        if 'label' in raw_event:
             event.old_value = raw_event['label']['name']
 
-        if raw_event['event'] == 'milestoned' and 'milestone' in raw_event:
+    @staticmethod
+    def _set_milestoned_value(event, raw_event, mongo_issue):
+        """
+        Sets the added milestone as new value of the event
+        """
+        if 'milestone' in raw_event:
             event.new_value = raw_event['milestone']['title']
 
-        if raw_event['event'] == 'demilestoned' and 'milestone' in raw_event:
+    @staticmethod
+    def _set_demilestoned_value(event, raw_event, mongo_issue):
+        """
+        Sets the removed milestone as old value of the event
+        """
+        if 'milestone' in raw_event:
             event.old_value = raw_event['milestone']['title']
 
-        if raw_event['event'] == 'renamed' and 'rename' in raw_event:
+    @staticmethod
+    def _set_renamed_values(event, raw_event, mongo_issue):
+        """
+        Sets the old and new title as values of the event and sets back the title of the issue
+        """
+        if 'rename' in raw_event:
             event.old_value = raw_event['rename']['from']
             event.new_value = raw_event['rename']['to']
 
             mongo_issue.title = raw_event['rename']['from']
 
-    def _process_comments(self, system_id, mongo_issue):
+    def _process_comments(self, mongo_issue, comments, comments_to_insert):
         """
         Processes the comments of an issue
 
-        :param system_id: id of the issue like it is given by the github API
         :param mongo_issue: object of our issue model
+        :param comments: comments of the issue, see :func:`~issueshark.backends.github.GithubBackend._get_issue_details`
+        :param comments_to_insert: list to which new comments are appended, the caller needs to insert them
         """
-        # Get all the comments for the corresponding issue
-        target_url = '%s/%s/comments' % (self.config.tracking_url, system_id)
-        comments = self._send_request(target_url)
-
         # Go through all comments
-        comments_to_insert = []
+        stored_comment_ids = self._get_stored_external_ids(IssueComment, mongo_issue, comments)
         for raw_comment in comments:
-            created_at = dateutil.parser.parse(raw_comment['created_at'])
-            try:
-                IssueComment.objects(external_id=raw_comment['id'], issue_id=mongo_issue.id).get()
+            if raw_comment['id'] in stored_comment_ids:
                 continue
-            except DoesNotExist:
-                comment = IssueComment(
-                    external_id=raw_comment['id'],
-                    issue_id=mongo_issue.id,
-                    created_at=created_at,
-                    author_id=self._get_people(raw_comment['user']['url']),
-                    comment=raw_comment['body'],
-                )
-                comments_to_insert.append(comment)
-
-        # If comments need to be inserted -> bulk insert
-        if comments_to_insert:
-            IssueComment.objects.insert(comments_to_insert, load_bulk=False)
+
+            comment = IssueComment(
+                external_id=raw_comment['id'],
+                issue_id=mongo_issue.id,
+                created_at=parse_date(raw_comment['created_at']),
+                author_id=self._get_people(raw_comment['user']['url']),
+                comment=raw_comment['body'],
+            )
+            comments_to_insert.append(comment)
+
+    @staticmethod
+    def _get_stored_external_ids(document_class, mongo_issue, raw_documents):
+        """
+        Gets the external ids of the events or comments of an issue that are already stored with one query
+
+        :param document_class: :class:`~pycoshark.mongomodels.Event` or :class:`~pycoshark.mongomodels.IssueComment`
+        :param mongo_issue: object of our issue model
+        :param raw_documents: events or comments of the issue like we got them from github
+        :return: set of the stored external ids
+        """
+        if not raw_documents:
+            return set()
+
+        external_ids = [raw_document['id'] for raw_document in raw_documents]
+        return set(document_class.objects(issue_id=mongo_issue.id, external_id__in=external_ids)
+                   .scalar('external_id'))
 
     def get_issues(self, search_state='all', start_date=None, sorting='asc', pagecount=1):
         """
@@ -290,9 +447,24 @@ class GithubBackend(BaseBackend):
         if user_url in self.people:
             return self.people[user_url]
 
-        raw_user = self._send_request(user_url)
-        name = raw_user['name']
+        name, email, username = self._get_name_and_email(self._send_request(user_url))
+
+        people_id = People.objects(
+            name=name,
+            email=email
+        ).upsert_one(name=name, email=email, username=username).id
+        self.people[user_url] = people_id
+        return people_id
+
+    @staticmethod
+    def _get_name_and_email(raw_user):
+        """
+        Gets the name, email, and username of a user. The name falls back to the login and the email to 'null'
 
+        :param raw_user: user like we got it from github
+        :return: tuple (name, email, username)
+        """
+        name = raw_user['name']
         if name is None:
             name = raw_user['login']
 
@@ -300,12 +472,7 @@ class GithubBackend(BaseBackend):
         if email is None:
             email = 'null'
 
-        people_id = People.objects(
-            name=name,
-            email=email
-        ).upsert_one(name=name, email=email, username=raw_user['login']).id
-        self.people[user_url] = people_id
-        return people_id
+        return name, email, raw_user['login']
 
     def _send_request(self, url):
         """
@@ -325,32 +492,59 @@ class GithubBackend(BaseBackend):
         # Make the request
         tries = 1
         while tries <= 3:
+            self._wait_for_rate_limit()
             logger.debug("Sending request to url: %s (Try: %s)" % (url, tries))
             resp = requests.get(url, headers=headers, proxies=self.config.get_proxy_dictionary(), auth=auth)
+            self._update_rate_limit(resp)
 
             if resp.status_code != 200:
                 logger.error("Problem with getting data via url %s. Error: %s" % (url, resp.text))
                 tries += 1
-                time.sleep(2)
+
+                # Secondary rate limits tell how long to wait, the primary rate limit is waited for before the next try
+                time.sleep(float(resp.headers.get('Retry-After', 2)))
             else:
-                # It can happen that we exceed the github api limit. If we have only 1 request left we will wait
-                if 'X-RateLimit-Remaining' in resp.headers and int(resp.headers['X-RateLimit-Remaining']) <= 1:
+                data = parse_response(resp)
+                logger.debug('Got response: %s', data)
 
-                    # We get the reset time (UTC Epoch seconds)
-                    time_when_reset = datetime.datetime.fromtimestamp(float(resp.headers['X-RateLimit-Reset']))
-                    now = datetime.datetime.now()
+                return data
 
-                    # Then we substract and add 10 seconds to it (so that we do not request directly at the threshold
-                    waiting_time = ((time_when_reset-now).total_seconds())+10
+        raise RequestException("Problem with getting data via url %s." % url)
 
-                    logger.info("Github API limit exceeded. Waiting for %0.5f seconds..." % waiting_time)
-                    time.sleep(waiting_time)
+    def _wait_for_rate_limit(self):
+        """
+        Takes one request from the rate limit of the github API. If not more requests are left than can be sent
+        concurrently, it waits until the limit is reset. Meanwhile, all other requests wait as well
+        """
+        with self.rate_limit_lock:
+            if self.rate_limit_remaining is None:
+                return
 
-                    resp = requests.get(url, headers=headers, proxies=self.config.get_proxy_dictionary(), auth=auth)
+            if self.rate_limit_remaining > ISSUE_DETAIL_WORKERS:
+                self.rate_limit_remaining -= 1
+                return
 
-                logger.debug('Got response: %s' % resp.json())
+            # We wait 10 seconds longer than needed, so that we do not request directly at the threshold
+            waiting_time = self.rate_limit_reset - time.time() + 10
+            if waiting_time > 0:
+                logger.info("Github API limit exceeded. Waiting for %0.5f seconds..." % waiting_time)
+                time.sleep(waiting_time)
 
-                return resp.json()
+            # The new limit is known with the next response
+            self.rate_limit_remaining = None
 
-        raise RequestException("Problem with getting data via url %s." % url)
+    def _update_rate_limit(self, resp):
+        """
+        Updates the rate limit of the github API with the headers of a response
+
+        :param resp: response of the github API
+        """
+        if 'X-RateLimit-Remaining' not in resp.headers or 'X-RateLimit-Reset' not in resp.headers:
+            return
+
+        with self.rate_limit_lock:
+            self.rate_limit_remaining = int(resp.headers['X-RateLimit-Remaining'])
+
+            # The reset time is given in UTC epoch seconds
+            self.rate_limit_reset = float(resp.headers['X-RateLimit-Reset'])
 
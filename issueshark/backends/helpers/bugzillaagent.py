@@ -1,10 +1,16 @@
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import time
 
 from collections import OrderedDict
 
+from issueshark.backends.helpers.parsing import parse_response
+
+#: Maximal number of users that are requested with one request
+USER_CHUNK_SIZE = 50
+
 
 class BugzillaApiException(Exception):
     """
@@ -63,6 +69,30 @@ class BugzillaAgent(object):
 
         return self._send_request('bug', options)['bugs']
 
+    def get_bug_pages(self, last_change_time=None, limit=50):
+        """
+        Yields the bugs page by page until an empty page is returned. The next page is requested while the current
+        page is processed. It starts directly after the bugs that were returned, so that no bugs are skipped if the
+        server returns less bugs than requested (e.g., because it limits the page size)
+
+        :param last_change_time: time since the bug was last changed
+        :param limit: number of bugs that are requested per page
+        """
+        def get_page(offset):
+            return self.get_bug_list(last_change_time=last_change_time, limit=limit, offset=offset)
+
+        offset = 0
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(get_page, offset)
+            while True:
+                issues = next_page.result()
+                if len(issues) == 0:
+                    return
+
+                offset += len(issues)
+                next_page = executor.submit(get_page, offset)
+                yield issues
+
     def get_user(self, id, options=None):
         """
         Gets the user via the id
@@ -75,6 +105,30 @@ class BugzillaAgent(object):
         except KeyError:
             return None
 
+    def get_users(self, names):
+        """
+        Gets several users with one request per :const:`USER_CHUNK_SIZE` users. Bugzilla fails the whole request if
+        one of the users cannot be found (e.g., because it was deleted). Therefore, the users of a failed chunk are
+        requested one by one, see :func:`~issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user`. Users
+        that are not found are not part of the result
+
+        :param names: login names of the users
+        """
+        users = []
+        for start in range(0, len(names), USER_CHUNK_SIZE):
+            chunk = names[start:start + USER_CHUNK_SIZE]
+            options = {
+                'names': [urllib.parse.quote_plus(str(name)) for name in chunk]
+            }
+
+            try:
+                users.extend(self._send_request('user', options)['users'])
+            except (KeyError, TypeError):
+                self.logger.warning('Could not get the users %s with one request, requesting them one by one...' %
+                                    chunk)
+                users.extend(user for user in (self.get_user(name) for name in chunk) if user is not None)
+        return users
+
     def get_issue_history(self, external_issue_id, new_since=None):
         """
         Gets the issue history for a specific issue
@@ -153,14 +207,15 @@ class BugzillaAgent(object):
         while got_no_response and time.time() < timeout_start + timeout:
             try:
                 resp = requests.get(request, proxies=self.proxy)
+                data = parse_response(resp)
                 if resp.status_code != 200:
                     self.logger.error("Problem with getting data via url %s. Error: %s" %
-                                      (request, resp.json()['message']))
+                                      (request, data['message']))
                 else:
                     got_no_response = False
 
-                self.logger.debug('Got response: %s' % resp.json())
-                return resp.json()
+                self.logger.debug('Got response: %s', data)
+                return data
             except Exception:
                 time.sleep(10)
-        self.logger.error('Something went wrong with getting data via url %s!' % request)
\ No newline at end of file
+        self.logger.error('Something went wrong with getting data via url %s!' % request)
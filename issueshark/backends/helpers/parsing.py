@@ -0,0 +1,48 @@
+import datetime
+from functools import lru_cache
+
+import ciso8601
+import dateutil.parser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=16384)
+def parse_date(value):
+    """
+    Parses a date of an issue tracking API. The APIs return ISO 8601 dates, which are parsed with ciso8601. Other
+    formats are parsed with dateutil. Dates repeat often (e.g., the creation dates of an issue and its first comment),
+    therefore the results are cached
+
+    :param value: date string (e.g., 2001-01-10T20:38:40Z)
+    """
+    try:
+        return ciso8601.parse_datetime(value)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+def as_utc(value):
+    """
+    Makes a date comparable with the dates that are stored in the MongoDB, which are naive dates in UTC
+
+    :param value: naive date in UTC or date with a timezone
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def parse_response(resp):
+    """
+    Parses the JSON body of a response. If orjson is installed it is used, as it is considerably faster than the json
+    module for large responses (e.g., pages of github issues or the comments of long living bugs)
+
+    :param resp: response of an issue tracking API (see: :class:`requests.Response`)
+    """
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
@@ -0,0 +1,122 @@
+from pymongo import UpdateOne
+
+from pycoshark.mongomodels import Issue, Event, IssueComment, People
+
+#: Maximal number of documents that are inserted with one request
+BULK_INSERT_SIZE = 1000
+
+#: Whether the indexes of :func:`create_indexes` were already created in this process
+_indexes_created = False
+
+
+def create_indexes():
+    """
+    Creates the compound indexes that are used to look up issues, events, and comments by their external id. The
+    models only define single field indexes. Creating an index that already exists is a no-op, but it is still only
+    done once per process
+    """
+    global _indexes_created
+    if _indexes_created:
+        return
+
+    Issue._get_collection().create_index([('issue_system_id', 1), ('external_id', 1)])
+    Event._get_collection().create_index([('issue_id', 1), ('external_id', 1)])
+    IssueComment._get_collection().create_index([('issue_id', 1), ('external_id', 1)])
+    _indexes_created = True
+
+
+def upsert_issues(issues_to_upsert):
+    """
+    Upserts the collected issues with one unordered bulk write and empties the list afterwards. Like
+    :func:`mongoengine.Document.save`, only the changed fields of stored issues are written, so that fields that other
+    tools changed since the issues were loaded are kept. New issues (e.g., created with their id assigned in advance)
+    are written completely
+
+    :param issues_to_upsert: list of :class:`~pycoshark.mongomodels.Issue` with an id
+    """
+    if not issues_to_upsert:
+        return
+
+    operations = []
+    for mongo_issue in issues_to_upsert:
+        if mongo_issue._created:
+            document = mongo_issue.to_mongo()
+            issue_id = document.pop('_id')
+            update = {'$set': document}
+        else:
+            issue_id = mongo_issue.id
+            set_fields, unset_fields = mongo_issue._delta()
+            update = {}
+            if set_fields:
+                update['$set'] = set_fields
+            if unset_fields:
+                update['$unset'] = unset_fields
+            if not update:
+                continue
+
+        operations.append(UpdateOne({'_id': issue_id}, update, upsert=True))
+
+    if operations:
+        Issue._get_collection().bulk_write(operations, ordered=False)
+
+    # Afterwards, the issues are in the same state as after saving them
+    for mongo_issue in issues_to_upsert:
+        mongo_issue._clear_changed_fields()
+        mongo_issue._created = False
+    del issues_to_upsert[:]
+
+
+def insert_documents(events_to_insert, comments_to_insert):
+    """
+    Bulk inserts the collected events and comments and empties both lists afterwards
+
+    :param events_to_insert: list of :class:`~pycoshark.mongomodels.Event` that are not yet stored
+    :param comments_to_insert: list of :class:`~pycoshark.mongomodels.IssueComment` that are not yet stored
+    """
+    bulk_insert(Event, events_to_insert)
+    del events_to_insert[:]
+
+    bulk_insert(IssueComment, comments_to_insert)
+    del comments_to_insert[:]
+
+
+def bulk_insert(document_class, documents):
+    """
+    Inserts the documents directly via the collection in chunks of :const:`BULK_INSERT_SIZE` documents. The
+    inserts are unordered, so that the database can process them in parallel
+
+    :param document_class: class of the documents (e.g., :class:`~pycoshark.mongomodels.Event`)
+    :param documents: list of documents of the document class or of raw documents (dictionaries) that should be \
+    inserted
+    """
+    collection = document_class._get_collection()
+    for start in range(0, len(documents), BULK_INSERT_SIZE):
+        chunk = [document if isinstance(document, dict) else document.to_mongo()
+                 for document in documents[start:start + BULK_INSERT_SIZE]]
+        collection.insert_many(chunk, ordered=False)
+
+
+def store_people(people):
+    """
+    Upserts several people with one bulk write. People are identified by their name and email address, like the unique
+    index of :class:`~pycoshark.mongomodels.People` does
+
+    :param people: list of tuples (key, name, email, username), where the key is used by the backend to look up the \
+    person (e.g., the username or the url of the user)
+    :return: dictionary key -> id of the stored person
+    """
+    if not people:
+        return {}
+
+    People._get_collection().bulk_write([
+        UpdateOne({'name': name, 'email': email}, {'$set': {'username': username}}, upsert=True)
+        for _, name, email, username in people
+    ], ordered=False)
+
+    people_ids = {}
+    for document in People._get_collection().find({'$or': [{'name': name, 'email': email}
+                                                           for _, name, email, _ in people]},
+                                                  {'name': 1, 'email': 1}):
+        people_ids[(document['name'], document['email'])] = document['_id']
+
+    return {key: people_ids[(name, email)] for key, name, email, _ in people}
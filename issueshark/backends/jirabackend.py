@@ -29,12 +29,8 @@ class JiraBackend(BaseBackend):
     """
     Backend that collects data via the JIRA API
     """
-    @property
-    def identifier(self):
-        """
-        Identifier of the backend (jira)
-        """
-        return 'jira'
+    #: Identifier of the backend (jira)
+    identifier = 'jira'
 
     def __init__(self, cfg, issue_system_id, project_id):
         """
@@ -29,12 +29,8 @@ class JiraBackend(BaseBackend):
     """
     Backend that collects data via the JIRA API
     """
-    @property
-    def identifier(self):
-        """
-        Identifier of the backend (jira)
-        """
-        return 'jiraOld'
+    #: Identifier of the backend (jira)
+    identifier = 'jiraOld'
 
     def __init__(self, cfg, issue_system_id, project_id):
         """
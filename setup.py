@@ -15,11 +15,20 @@ setup(
     author_email='trautsch@cs.uni-goettingen.de',
     description='Collect data from issue tracking systems',
     install_requires=['mongoengine>=0.23.0', 'pymongo', 'requests>=2.10.0', 'oauthlib>=3.0.0',
-                      'cryptography>=1.3.4', 'python-dateutil', 'validate_email',
+                      'cryptography>=1.3.4', 'python-dateutil', 'ciso8601',
                       'jira==2.0.0', 'pycoshark>=1.3.2', 'mock'],
     url='https://github.com/smartshark/issueSHARK',
     download_url='https://github.com/smartshark/issueSHARK/zipball/master',
     packages=find_packages(),
+    entry_points={
+        'issueshark.backends': [
+            'bugzilla = issueshark.backends.bugzilla:BugzillaBackend',
+            'bugzillaOld = issueshark.backends.bugzilla_old:BugzillaBackend',
+            'github = issueshark.backends.github:GithubBackend',
+            'jira = issueshark.backends.jirabackend:JiraBackend',
+            'jiraOld = issueshark.backends.jirabackend_old:JiraBackend',
+        ],
+    },
     test_suite ='tests',
     zip_safe=False,
     include_package_data=True,
@@ -1,6 +1,11 @@
+import gc
+import pkgutil
+import sys
 import unittest
 import logging
 
+import mock
+
 from issueshark.backends.basebackend import BaseBackend
 
 
@@ -53,4 +58,88 @@ class BaseBackendTest(unittest.TestCase):
     def test_find_fitting_backend_bugzilla(self):
         config = ConfigMock(None, None, None, None, None, None, None, None, 'bugzilla', None, None, None, None, None,
                             None, None, None)
-        self.assertEqual('BugzillaBackend', type(BaseBackend.find_fitting_backend(config, None, None)).__name__)
\ No newline at end of file
+        self.assertEqual('BugzillaBackend', type(BaseBackend.find_fitting_backend(config, None, None)).__name__)
+
+    def test_import_backends_only_once(self):
+        BaseBackend._import_backends()
+
+        with mock.patch('issueshark.backends.basebackend.pkgutil.iter_modules', wraps=pkgutil.iter_modules) as \
+                iter_modules_mock:
+            BaseBackend._import_backends()
+            iter_modules_mock.assert_not_called()
+
+            BaseBackend._import_backends(flush_cache=True)
+            iter_modules_mock.assert_called_once()
+
+    def test_backend_without_identifier(self):
+        class NoIdentifierBackend(BaseBackend):
+            def process(self):
+                pass
+
+        try:
+            with self.assertRaises(TypeError):
+                BaseBackend._import_backends(flush_cache=True)
+
+            with self.assertRaises(TypeError):
+                BaseBackend.get_all_possible_backend_options()
+        finally:
+            # The class is referenced by BaseBackend.__subclasses__() until it is garbage collected
+            del NoIdentifierBackend
+            gc.collect()
+            BaseBackend._import_backends(flush_cache=True)
+
+    def test_find_fitting_backend_instantiates_only_chosen_backend(self):
+        config = ConfigMock(None, None, None, None, None, None, None, None, 'github', None, None, None, None, None,
+                            None, None, None)
+        BaseBackend._import_backends()
+
+        with mock.patch('issueshark.backends.jirabackend.JiraBackend.__init__', side_effect=AssertionError), \
+                mock.patch('issueshark.backends.bugzilla.BugzillaBackend.__init__', side_effect=AssertionError):
+            self.assertEqual('GithubBackend', type(BaseBackend.find_fitting_backend(config, None, None)).__name__)
+
+    def test_get_all_possible_backend_options_does_not_import_builtin_backends(self):
+        with mock.patch('issueshark.backends.basebackend._cached_import') as cached_import_mock:
+            all_options = BaseBackend.get_all_possible_backend_options()
+
+        self.assertEqual({'github', 'jira', 'jiraOld', 'bugzilla', 'bugzillaOld'}, all_options)
+        imported_modules = [call[0][0] for call in cached_import_mock.call_args_list]
+        self.assertNotIn('issueshark.backends.github', imported_modules)
+        self.assertNotIn('issueshark.backends.jirabackend', imported_modules)
+        self.assertNotIn('issueshark.backends.bugzilla', imported_modules)
+
+    @mock.patch('issueshark.backends.basebackend._get_entry_point_backends')
+    def test_find_fitting_backend_entry_point(self, entry_point_backends_mock):
+        class CustomBackend(BaseBackend):
+            identifier = 'custom'
+
+            def process(self):
+                pass
+
+        entry_point_backends_mock.return_value = {'custom': '%s:CustomBackend' % __name__}
+        BaseBackend._registered_backends = None
+        config = ConfigMock(None, None, None, None, None, None, None, None, 'custom', None, None, None, None, None,
+                            None, None, None)
+
+        try:
+            with mock.patch.object(sys.modules[__name__], 'CustomBackend', CustomBackend, create=True):
+                self.assertIn('custom', BaseBackend.get_all_possible_backend_options())
+                self.assertIsInstance(BaseBackend.find_fitting_backend(config, None, None), CustomBackend)
+        finally:
+            BaseBackend._registered_backends = None
+            # The class is referenced by BaseBackend.__subclasses__() until it is garbage collected
+            del CustomBackend
+            gc.collect()
+            BaseBackend._import_backends(flush_cache=True)
+
+    @mock.patch('issueshark.backends.basebackend._get_entry_point_backends')
+    def test_find_fitting_backend_entry_point_with_wrong_identifier(self, entry_point_backends_mock):
+        entry_point_backends_mock.return_value = {'custom': 'issueshark.backends.github:GithubBackend'}
+        BaseBackend._registered_backends = None
+        config = ConfigMock(None, None, None, None, None, None, None, None, 'custom', None, None, None, None, None,
+                            None, None, None)
+
+        try:
+            with self.assertRaises(ValueError):
+                BaseBackend.find_fitting_backend(config, None, None)
+        finally:
+            BaseBackend._registered_backends = None
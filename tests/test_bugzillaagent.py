@@ -2,6 +2,9 @@ import unittest
 import logging
 import datetime
 
+import mock
+
+from issueshark.backends.helpers import bugzillaagent
 from issueshark.backends.helpers.bugzillaagent import BugzillaAgent, BugzillaApiException
 
 
@@ -88,6 +91,62 @@ class BugzillaAgentTest(unittest.TestCase):
         ba = BugzillaAgent(self.logger, self.conf)
         self.assertEqual('https://bz.apache.org/bugzilla/rest.cgi/user/hans', ba._build_query('user/hans', None))
 
+    def test_get_users(self):
+        ba = BugzillaAgent(self.logger, self.conf)
+        with mock.patch.object(ba, '_send_request', return_value={'users': []}) as send_request_mock:
+            self.assertEqual([], ba.get_users(['hans@example.org', 'peter']))
+            send_request_mock.assert_called_once_with('user', {'names': ['hans%40example.org', 'peter']})
+
+    @mock.patch.object(bugzillaagent, 'USER_CHUNK_SIZE', 2)
+    def test_get_users_in_chunks(self):
+        ba = BugzillaAgent(self.logger, self.conf)
+        with mock.patch.object(ba, '_send_request', side_effect=[{'users': [{'name': 'hans'}, {'name': 'peter'}]},
+                                                                 {'users': [{'name': 'paul'}]}]) as send_request_mock:
+            self.assertEqual([{'name': 'hans'}, {'name': 'peter'}, {'name': 'paul'}],
+                             ba.get_users(['hans', 'peter', 'paul']))
+            self.assertEqual([mock.call('user', {'names': ['hans', 'peter']}), mock.call('user', {'names': ['paul']})],
+                             send_request_mock.call_args_list)
+
+    @mock.patch.object(bugzillaagent, 'USER_CHUNK_SIZE', 2)
+    def test_get_users_with_failed_chunk(self):
+        ba = BugzillaAgent(self.logger, self.conf)
+
+        # The first chunk fails, as one of its users does not exist. Only its users are requested one by one
+        responses = {
+            'user': [{'error': True, 'message': 'There is no user named \'deleted\'.'}, {'users': [{'name': 'paul'}]}],
+            'user/hans': [{'users': [{'name': 'hans'}]}],
+            'user/deleted': [{'error': True, 'message': 'There is no user named \'deleted\'.'}],
+        }
+        with mock.patch.object(ba, '_send_request', side_effect=lambda endpoint, options: responses[endpoint].pop(0)) \
+                as send_request_mock:
+            self.assertEqual([{'name': 'hans'}, {'name': 'paul'}], ba.get_users(['hans', 'deleted', 'paul']))
+            self.assertEqual([mock.call('user', {'names': ['hans', 'deleted']}),
+                              mock.call('user/hans', None),
+                              mock.call('user/deleted', None),
+                              mock.call('user', {'names': ['paul']})],
+                             send_request_mock.call_args_list)
+
+    def test_get_bug_pages(self):
+        ba = BugzillaAgent(self.logger, self.conf)
+
+        # The server returns less bugs than requested, the next page must start directly after them
+        pages = {0: [{'id': 1}], 1: [{'id': 95}]}
+        with mock.patch.object(ba, 'get_bug_list',
+                               side_effect=lambda last_change_time, limit, offset: pages.get(offset, [])) \
+                as get_bug_list_mock:
+            self.assertEqual([[{'id': 1}], [{'id': 95}]], list(ba.get_bug_pages(None, 2)))
+            self.assertEqual([0, 1, 2], [call[1]['offset'] for call in get_bug_list_mock.call_args_list])
+            self.assertEqual({2}, {call[1]['limit'] for call in get_bug_list_mock.call_args_list})
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.requests.get')
+    def test_send_request(self, get_mock):
+        ba = BugzillaAgent(self.logger, self.conf)
+        get_mock.return_value = mock.Mock(status_code=200, content=b'{"bugs": [{"id": 1}]}')
+        get_mock.return_value.json.return_value = {'bugs': [{'id': 1}]}
+
+        self.assertEqual({'bugs': [{'id': 1}]}, ba._send_request('bug', None))
+        get_mock.assert_called_once_with('https://bz.apache.org/bugzilla/rest.cgi/bug', proxies=None)
+
     def test_build_query_issue_history(self):
         ba = BugzillaAgent(self.logger, self.conf)
         self.assertEqual('https://bz.apache.org/bugzilla/rest.cgi/bug/1241/history', ba._build_query('bug/1241/history',
@@ -10,10 +10,12 @@ import mock
 from mongoengine import connect
 import mongomock
 import mongoengine
+from issueshark.backends.basebackend import BaseBackend
 from issueshark.backends.bugzilla import BugzillaBackend
 from pycoshark.mongomodels import IssueSystem, Project, Issue, Event, IssueComment, People
 
 from issueshark.backends.helpers.bugzillaagent import BugzillaAgent
+from issueshark.backends.helpers.storage import insert_documents, upsert_issues
 
 
 class ConfigMock(object):
@@ -99,9 +101,28 @@ class BugzillaBackendTest(unittest.TestCase):
                                'Nonsense?product=Blub', 'bugzilla', None, None, None,
                                None, None, None, 'DEBUG', '123')
 
+    @staticmethod
+    def _transform_and_upsert_issue(bugzilla_backend, bz_issue, bz_comments):
+        issues_to_upsert = []
+        mongo_issue = bugzilla_backend._get_page_issues([bz_issue])[str(bz_issue['id'])]
+        bugzilla_backend._transform_issue(bz_issue, bz_comments, mongo_issue, issues_to_upsert)
+        upsert_issues(issues_to_upsert)
+
+    @staticmethod
+    def _process_and_insert_comments(bugzilla_backend, mongo_issue_id, comments):
+        comments_to_insert = []
+        bugzilla_backend._process_comments(mongo_issue_id, comments, comments_to_insert)
+        insert_documents([], comments_to_insert)
+
+    @staticmethod
+    def _store_and_insert_events(bugzilla_backend, histories, bz_issue, mongo_issue):
+        events_to_insert = []
+        bugzilla_backend._store_events(histories, bz_issue, mongo_issue, events_to_insert)
+        insert_documents(events_to_insert, [])
+
     def test_transform_issue(self):
         bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
-        bugzilla_backend._transform_issue(self.issue_95, self.issue_95_comments)
+        self._transform_and_upsert_issue(bugzilla_backend, self.issue_95, self.issue_95_comments)
 
         stored_issue = Issue.objects(external_id="95").get()
         blocks_issue_1 = Issue.objects(external_id="31389").get()
@@ -145,8 +166,8 @@ class BugzillaBackendTest(unittest.TestCase):
 
     def test_store_issue_two_times(self):
         bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
-        bugzilla_backend._transform_issue(self.issue_1, self.issue_95_comments)
-        bugzilla_backend._transform_issue(self.issue_1, self.issue_95_comments)
+        self._transform_and_upsert_issue(bugzilla_backend, self.issue_1, self.issue_95_comments)
+        self._transform_and_upsert_issue(bugzilla_backend, self.issue_1, self.issue_95_comments)
 
         stored_issues = Issue.objects.all()
         self.assertEqual(len(stored_issues), 1)
@@ -159,7 +180,7 @@ class BugzillaBackendTest(unittest.TestCase):
 
         get_user_mock.side_effect = [self.dev_tomcat_file, self.conor_user]
 
-        bugzilla_backend._process_comments(issue.id, self.issue_95_comments)
+        self._process_and_insert_comments(bugzilla_backend, issue.id, self.issue_95_comments)
 
         all_comments = IssueComment.objects(issue_id=issue.id).all()
         self.assertEqual(2, len(all_comments))
@@ -187,8 +208,8 @@ class BugzillaBackendTest(unittest.TestCase):
 
         get_user_mock.side_effect = [self.dev_tomcat_file, self.conor_user]
 
-        bugzilla_backend._process_comments(issue.id, self.issue_95_comments)
-        bugzilla_backend._process_comments(issue.id, self.issue_95_comments)
+        self._process_and_insert_comments(bugzilla_backend, issue.id, self.issue_95_comments)
+        self._process_and_insert_comments(bugzilla_backend, issue.id, self.issue_95_comments)
 
         self.assertEqual(2, len(IssueComment.objects.all()))
 
@@ -199,7 +220,7 @@ class BugzillaBackendTest(unittest.TestCase):
         issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id).save()
 
         get_user_mock.side_effect = [self.craig_user, self.conor_user, self.craig_user, self.conor_user, self.conor_user]
-        bugzilla_backend._store_events(self.issue_95_history, self.issue_95, issue)
+        self._store_and_insert_events(bugzilla_backend, self.issue_95_history, self.issue_95, issue)
 
         craig_user = People.objects(email="craig.mcclanahan@sun.com").get()
         conor_user = People.objects(email="conor@apache.org").get()
@@ -350,9 +371,125 @@ class BugzillaBackendTest(unittest.TestCase):
 
         get_user_mock.side_effect = [self.craig_user, self.conor_user, self.craig_user, self.conor_user,
                                      self.conor_user]
-        bugzilla_backend._store_events(self.issue_95_history, self.issue_95, issue)
-        bugzilla_backend._store_events(self.issue_95_history, self.issue_95, issue)
+        self._store_and_insert_events(bugzilla_backend, self.issue_95_history, self.issue_95, issue)
+        self._store_and_insert_events(bugzilla_backend, self.issue_95_history, self.issue_95, issue)
 
         all_events = Event.objects.all()
 
         self.assertEqual(16, len(all_events))
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    def test_store_events_with_buffer(self, get_user_mock):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id).save()
+
+        get_user_mock.side_effect = [self.craig_user, self.conor_user, self.craig_user, self.conor_user,
+                                     self.conor_user]
+        events_to_insert = []
+        bugzilla_backend._store_events(self.issue_95_history, self.issue_95, issue, events_to_insert)
+
+        self.assertEqual(16, len(events_to_insert))
+        self.assertEqual(0, len(Event.objects.all()))
+        self.assertEqual('95%%0%%0', events_to_insert[0]['external_id'])
+        self.assertEqual(16, len({event['external_id'] for event in events_to_insert}))
+
+        insert_documents(events_to_insert, [])
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(0, len(events_to_insert))
+
+    def test_get_issue_id_by_system_id_cached(self):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+
+        issue_id = bugzilla_backend._get_issue_id_by_system_id(12)
+        self.assertEqual(issue_id, bugzilla_backend.issue_id_cache['12'])
+
+        with mock.patch('issueshark.backends.bugzilla.Issue.objects') as objects_mock:
+            self.assertEqual(issue_id, bugzilla_backend._get_issue_id_by_system_id('12'))
+            objects_mock.assert_not_called()
+
+        self.assertEqual(1, len(Issue.objects(external_id='12')))
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_users')
+    def test_store_events_with_prefetched_users(self, get_users_mock, get_user_mock):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id).save()
+
+        get_users_mock.return_value = [self.conor_user, self.craig_user]
+        bugzilla_backend._prefetch_users(self.issue_95_history, [])
+        get_users_mock.assert_called_once_with(['conor@apache.org', 'craig.mcclanahan@sun.com'])
+
+        self._store_and_insert_events(bugzilla_backend, self.issue_95_history, self.issue_95, issue)
+        get_user_mock.assert_not_called()
+
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(0, len(bugzilla_backend.users))
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_users')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_issue_history')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_comments')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_bug_list')
+    def test_process(self, get_bug_list_mock, get_comments_mock, get_issue_history_mock, get_users_mock,
+                     get_user_mock):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+
+        get_bug_list_mock.side_effect = lambda last_change_time, limit, offset: [self.issue_95] if offset == 0 else []
+        get_comments_mock.return_value = self.issue_95_comments
+        get_issue_history_mock.return_value = self.issue_95_history
+        get_users_mock.return_value = [self.conor_user, self.craig_user, self.dev_tomcat_file]
+        get_user_mock.return_value = None
+
+        bugzilla_backend.process()
+
+        get_comments_mock.assert_called_once_with(self.issue_95['id'])
+        get_issue_history_mock.assert_called_once_with(self.issue_95['id'])
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(2, len(IssueComment.objects.all()))
+
+        mongo_issue = Issue.objects(external_id=str(self.issue_95['id'])).get()
+        self.assertEqual(self.issue_95['summary'], mongo_issue.title)
+        self.assertEqual(set(Event.objects.scalar('issue_id')), {mongo_issue.id})
+
+    def test_get_page_issues_caches_ids(self):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        stored_issue = Issue(external_id="95", issue_system_id=self.issues_system_id).save()
+        Issue(external_id="UNRELATED", issue_system_id=self.issues_system_id).save()
+
+        mongo_issues = bugzilla_backend._get_page_issues([self.issue_95, self.issue_1])
+
+        # Only the issues of the page are cached, not all issues of the issue system
+        self.assertEqual({'95': stored_issue.id, '1': mongo_issues['1'].id}, bugzilla_backend.issue_id_cache)
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    def test_get_people_without_email(self, get_user_mock):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        get_user_mock.return_value = None
+
+        self.assertEqual('hans@example.org', People.objects(id=bugzilla_backend._get_people('hans@example.org'))
+                         .get().email)
+        self.assertEqual('nobody@nobody.com', People.objects(id=bugzilla_backend._get_people('hans')).get().email)
+
+    def test_backend_class(self):
+        self.assertEqual('BugzillaBackend.process', BugzillaBackend.process.__qualname__)
+        self.assertIs(BugzillaBackend, BaseBackend._get_backend_class('bugzilla'))
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    def test_store_events_with_missing_old_events(self, get_user_mock):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id).save()
+
+        get_user_mock.side_effect = [self.craig_user, self.conor_user, self.craig_user, self.conor_user,
+                                     self.conor_user]
+        self._store_and_insert_events(bugzilla_backend, self.issue_95_history, self.issue_95, issue)
+
+        # Only the newest events are stored (e.g., because an unordered bulk insert failed partially)
+        Event.objects(created_at__lt=datetime.datetime(2001, 3, 2)).delete()
+        self.assertEqual(3, len(Event.objects.all()))
+
+        self._store_and_insert_events(bugzilla_backend, self.issue_95_history, self.issue_95, issue)
+        self.assertEqual(16, len(Event.objects.all()))
@@ -0,0 +1,310 @@
+import configparser
+import copy
+import unittest
+import os
+import datetime
+
+import logging
+import json
+import mock
+import mongomock
+import mongoengine
+from issueshark.backends.bugzilla_old import BugzillaBackend
+from pycoshark.mongomodels import IssueSystem, Project, Issue, Event, IssueComment, People
+
+from issueshark.backends.helpers.bugzillaagent import BugzillaAgent
+from issueshark.backends.helpers.storage import insert_documents
+
+
+class ConfigMock(object):
+    def __init__(self, db_user, db_password, db_database, db_hostname, db_port, db_authentication, project_name,
+                 issue_url, backend, proxy_host, proxy_port, proxy_user, proxy_password, issue_user, issue_password,
+                 debug, token):
+        self.db_user = db_user
+        self.db_password = db_password
+        self.db_database = db_database
+        self.db_hostname = db_hostname
+        self.db_port = db_port
+        self.db_authentication = db_authentication
+        self.project_name = project_name
+        self.tracking_url = issue_url
+        self.identifier = backend
+        self.proxy_host = proxy_host
+        self.proxy_port = proxy_port
+        self.proxy_user = proxy_user
+        self.proxy_password = proxy_password
+        self.issue_user = issue_user
+        self.issue_password = issue_password
+        self.debug = debug
+        self.token = token
+
+    def get_debug_level(self):
+        return logging.DEBUG
+
+    def get_proxy_dictionary(self):
+        return None
+
+    def use_token(self):
+        return True
+
+
+class BugzillaOldBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/issue1.json", 'r', encoding='utf-8') as \
+                issue_1_file:
+            self.issue_1 = json.load(issue_1_file)
+
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/issue95.json", 'r', encoding='utf-8') as \
+                issue_95_file:
+            self.issue_95 = json.load(issue_95_file)
+
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/issue95_comments.json", 'r', encoding='utf-8') as \
+                issue_95_comments_file:
+            self.issue_95_comments = json.load(issue_95_comments_file)
+
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/issue95_history.json", 'r', encoding='utf-8') as \
+                issue_95_history_file:
+            self.issue_95_history = json.load(issue_95_history_file)
+
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/conor_apache_org_user.json", 'r', encoding='utf-8') as \
+                conor_user_file:
+            self.conor_user = json.load(conor_user_file)
+
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/dev_tomcat_apache_org_user.json", 'r', encoding='utf-8') as \
+                dev_tomcat_file:
+            self.dev_tomcat_file = json.load(dev_tomcat_file)
+
+        with open(os.path.dirname(os.path.realpath(__file__)) + "/data/bugzilla/craig_mcclanahan_user.json", 'r', encoding='utf-8') as \
+                craig_user_file:
+            self.craig_user = json.load(craig_user_file)
+
+        # Create testconfig
+        config = configparser.ConfigParser()
+        config.read(os.path.dirname(os.path.realpath(__file__)) + "/data/used_test_config.cfg")
+        mongoengine.connection.disconnect()
+        mongoengine.connect('testdb', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+        Project.drop_collection()
+        IssueSystem.drop_collection()
+        Issue.drop_collection()
+        IssueComment.drop_collection()
+        Event.drop_collection()
+        People.drop_collection()
+
+        self.project_id = Project(name='Bla').save().id
+        self.issues_system_id = IssueSystem(project_id=self.project_id,
+                                            url="https://issues.apache.org/search?jql=project=BLA",
+                                            last_updated=datetime.datetime.now()).save().id
+
+        self.conf = ConfigMock(None, None, None, None, None, None, 'Bla',
+                               'Nonsense?product=Blub', 'bugzillaOld', None, None, None,
+                               None, None, None, 'DEBUG', '123')
+
+    @staticmethod
+    def _process_and_insert_issue(bugzilla_backend, bz_issue, comments, histories, stored_documents=()):
+        events_to_insert = []
+        comments_to_insert = []
+        bugzilla_backend._process_issue(bz_issue, comments, histories, events_to_insert, comments_to_insert,
+                                        *stored_documents)
+        insert_documents(events_to_insert, comments_to_insert)
+
+    def _process(self, bz_issues):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        with mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_bug_list') as get_bug_list_mock, \
+                mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_comments') as get_comments_mock, \
+                mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_issue_history') \
+                as get_issue_history_mock, \
+                mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_users') as get_users_mock, \
+                mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user') as get_user_mock:
+            get_bug_list_mock.side_effect = lambda last_change_time, limit, offset: bz_issues if offset == 0 else []
+            get_comments_mock.return_value = self.issue_95_comments
+            get_issue_history_mock.return_value = self.issue_95_history
+            get_users_mock.return_value = [self.conor_user, self.craig_user, self.dev_tomcat_file]
+            get_user_mock.return_value = None
+
+            bugzilla_backend.process()
+            return get_comments_mock, get_issue_history_mock, get_users_mock
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_users')
+    def test_get_stored_documents(self, get_users_mock, get_user_mock):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        get_users_mock.return_value = [self.conor_user, self.craig_user, self.dev_tomcat_file]
+        get_user_mock.return_value = None
+        self._process_and_insert_issue(bugzilla_backend, self.issue_95, self.issue_95_comments, self.issue_95_history)
+        stored_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='95').get()
+
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        with mock.patch('issueshark.backends.bugzilla_old.Event.objects', wraps=Event.objects) as events_mock:
+            stored_issues, stored_event_ids, stored_comment_ids = \
+                bugzilla_backend._get_stored_documents([self.issue_95, self.issue_1])
+            self.assertEqual(1, events_mock.call_count)
+
+        self.assertEqual({'95', '1'}, set(stored_issues))
+        self.assertEqual(stored_issue.id, stored_issues['95'].id)
+        self.assertEqual(set(Event.objects(issue_id=stored_issue.id).scalar('external_id')),
+                         stored_event_ids[stored_issue.id])
+        self.assertEqual(16, len(stored_event_ids[stored_issue.id]))
+        self.assertEqual(set(IssueComment.objects(issue_id=stored_issue.id).scalar('external_id')),
+                         stored_comment_ids[stored_issue.id])
+        self.assertEqual(2, len(stored_comment_ids[stored_issue.id]))
+
+        # Issues that are not stored yet get an id, but are not saved
+        new_issue = stored_issues['1']
+        self.assertIsNotNone(new_issue.id)
+        self.assertEqual(new_issue.id, bugzilla_backend.issue_id_cache['1'])
+        self.assertEqual(set(), stored_event_ids[new_issue.id])
+        self.assertEqual(set(), stored_comment_ids[new_issue.id])
+        self.assertEqual(0, Issue.objects(issue_system_id=self.issues_system_id, external_id='1').count())
+
+    def test_process(self):
+        get_comments_mock, get_issue_history_mock, _ = self._process([self.issue_95])
+
+        get_comments_mock.assert_called_once_with(self.issue_95['id'])
+        get_issue_history_mock.assert_called_once_with(self.issue_95['id'])
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(2, len(IssueComment.objects.all()))
+
+        # The issue is stored in its original version
+        mongo_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='95').get()
+        self.assertEqual('NEW', mongo_issue.status)
+        self.assertEqual(datetime.datetime(2008, 2, 22, 12, 18, 59), mongo_issue.updated_at)
+        self.assertEqual(set(Event.objects.scalar('issue_id')), {mongo_issue.id})
+        self.assertEqual(set(IssueComment.objects.scalar('issue_id')), {mongo_issue.id})
+
+    def test_process_stored_issues(self):
+        self._process([self.issue_95])
+
+        # The issue was changed since it was stored, therefore its events and comments are processed again
+        changed_issue = copy.deepcopy(self.issue_95)
+        changed_issue['last_change_time'] = '2008-02-23T12:18:59Z'
+        get_comments_mock, get_issue_history_mock, _ = self._process([changed_issue])
+
+        get_comments_mock.assert_called_once_with(self.issue_95['id'])
+        get_issue_history_mock.assert_called_once_with(self.issue_95['id'])
+        self.assertEqual(1, Issue.objects(issue_system_id=self.issues_system_id, external_id='95').count())
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(16, len(set(Event.objects.scalar('external_id'))))
+        self.assertEqual(2, len(IssueComment.objects.all()))
+        self.assertEqual(2, len(set(IssueComment.objects.scalar('external_id'))))
+
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_user')
+    @mock.patch('issueshark.backends.helpers.bugzillaagent.BugzillaAgent.get_users')
+    def test_process_issue_with_and_without_prefetched_documents(self, get_users_mock, get_user_mock):
+        get_users_mock.return_value = [self.conor_user, self.craig_user, self.dev_tomcat_file]
+        get_user_mock.return_value = None
+
+        # Prefetched documents
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        self._process_and_insert_issue(bugzilla_backend, self.issue_95, self.issue_95_comments, self.issue_95_history,
+                                       bugzilla_backend._get_stored_documents([self.issue_95]))
+
+        mongo_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='95').get()
+        prefetched_issue = mongo_issue.to_mongo().to_dict()
+        prefetched_events = sorted(Event.objects.scalar('external_id', 'status', 'old_value', 'new_value'))
+        prefetched_comments = sorted(IssueComment.objects.scalar('created_at', 'comment'))
+        self.assertEqual(16, len(prefetched_events))
+        self.assertEqual(2, len(prefetched_comments))
+
+        # Without prefetched documents the stored issue, events, and comments are queried. The linked issues are kept,
+        # so that the issue links of both runs are the same
+        mongo_issue.delete()
+        Event.drop_collection()
+        IssueComment.drop_collection()
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        bugzilla_backend.bugzilla_agent = BugzillaAgent(None, self.conf)
+        self._process_and_insert_issue(bugzilla_backend, self.issue_95, self.issue_95_comments, self.issue_95_history)
+
+        mongo_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='95').get()
+        issue = mongo_issue.to_mongo().to_dict()
+        del issue['_id']
+        del prefetched_issue['_id']
+        self.assertEqual(prefetched_issue, issue)
+        self.assertEqual(prefetched_events, sorted(Event.objects.scalar('external_id', 'status', 'old_value',
+                                                                        'new_value')))
+        self.assertEqual(prefetched_comments, sorted(IssueComment.objects.scalar('created_at', 'comment')))
+        self.assertEqual({mongo_issue.id}, set(Event.objects.scalar('issue_id')))
+
+        # Already stored events and comments are not inserted again, neither with nor without prefetched documents
+        self._process_and_insert_issue(bugzilla_backend, self.issue_95, self.issue_95_comments, self.issue_95_history)
+        self._process_and_insert_issue(bugzilla_backend, self.issue_95, self.issue_95_comments, self.issue_95_history,
+                                       bugzilla_backend._get_stored_documents([self.issue_95]))
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(2, len(IssueComment.objects.all()))
+
+    def test_is_unchanged(self):
+        self.assertFalse(BugzillaBackend._is_unchanged(self.issue_95, None))
+        self.assertFalse(BugzillaBackend._is_unchanged(self.issue_95, Issue(external_id='95')))
+        self.assertTrue(BugzillaBackend._is_unchanged(
+            self.issue_95, Issue(external_id='95', updated_at=datetime.datetime(2008, 2, 22, 12, 18, 59))))
+        self.assertFalse(BugzillaBackend._is_unchanged(
+            self.issue_95, Issue(external_id='95', updated_at=datetime.datetime(2008, 2, 22, 12, 18, 58))))
+
+    def test_process_unchanged_issue(self):
+        self._process([self.issue_95])
+        get_comments_mock, get_issue_history_mock, get_users_mock = self._process([self.issue_95])
+
+        get_comments_mock.assert_not_called()
+        get_issue_history_mock.assert_not_called()
+        get_users_mock.assert_not_called()
+        self.assertEqual(16, len(Event.objects.all()))
+        self.assertEqual(2, len(IssueComment.objects.all()))
+
+    def test_process_issue_with_changed_status(self):
+        self._process([self.issue_95])
+
+        # Bugzilla updates the last change time with each change, even if only one field was changed
+        changed_issue = copy.deepcopy(self.issue_95)
+        changed_issue['status'] = 'REOPENED'
+        changed_issue['last_change_time'] = '2008-02-23T12:18:59Z'
+        get_comments_mock, get_issue_history_mock, _ = self._process([changed_issue])
+
+        get_comments_mock.assert_called_once_with(self.issue_95['id'])
+        get_issue_history_mock.assert_called_once_with(self.issue_95['id'])
+        mongo_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='95').get()
+        self.assertEqual(datetime.datetime(2008, 2, 23, 12, 18, 59), mongo_issue.updated_at)
+
+    def test_process_issue_with_changed_link(self):
+        self._process([self.issue_95])
+
+        changed_issue = copy.deepcopy(self.issue_95)
+        changed_issue['blocks'].append(12345)
+        changed_issue['last_change_time'] = '2008-02-23T12:18:59Z'
+        get_comments_mock, get_issue_history_mock, _ = self._process([changed_issue])
+
+        get_comments_mock.assert_called_once_with(self.issue_95['id'])
+        get_issue_history_mock.assert_called_once_with(self.issue_95['id'])
+        linked_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='12345').get()
+        mongo_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='95').get()
+        self.assertIn({'issue_id': linked_issue.id, 'type': 'Blocker', 'effect': 'blocks'}, mongo_issue.issue_links)
+
+    def test_prefetch_issue_ids(self):
+        bugzilla_backend = BugzillaBackend(self.conf, self.issues_system_id, self.project_id)
+        known_issue = Issue(issue_system_id=self.issues_system_id, external_id='31389', title='Known',
+                            status='CLOSED').save()
+
+        # Issue 95 links to the known issue 31389 and to the unknown issue 12345
+        bz_issue = copy.deepcopy(self.issue_95)
+        bz_issue['blocks'] = [31389]
+        bz_issue['depends_on'] = [12345]
+        bz_issue['dupe_of'] = None
+        bugzilla_backend._prefetch_issue_ids(bugzilla_backend._get_linked_system_ids([bz_issue], []))
+
+        self.assertEqual(2, Issue.objects.count())
+        stub_issue = Issue.objects(issue_system_id=self.issues_system_id, external_id='12345').get()
+        self.assertIsNone(stub_issue.title)
+
+        mongo_issue = Issue.objects(id=known_issue.id).get()
+        self.assertEqual('Known', mongo_issue.title)
+        self.assertEqual('CLOSED', mongo_issue.status)
+
+        self.assertEqual({'31389': known_issue.id, '12345': stub_issue.id}, bugzilla_backend.issue_id_cache)
+
+        # Cached issues are neither queried nor created again
+        with mock.patch('issueshark.backends.bugzilla_old.Issue._get_collection') as get_collection_mock:
+            bugzilla_backend._prefetch_issue_ids({31389, 12345})
+            get_collection_mock.assert_not_called()
+        self.assertEqual(known_issue.id, bugzilla_backend._get_issue_id_by_system_id(31389))
+        self.assertEqual(2, Issue.objects.count())
@@ -3,6 +3,7 @@ import unittest
 import os
 import json
 import datetime
+import time
 
 import logging
 import mock
@@ -10,7 +11,8 @@ from bson import ObjectId
 from mongoengine import connect
 import mongomock
 import mongoengine
-from issueshark.backends.github import GithubBackend
+from issueshark.backends.github import GithubBackend, ISSUE_DETAIL_WORKERS
+from issueshark.backends.helpers.storage import insert_documents, upsert_issues
 from pycoshark.mongomodels import IssueSystem, Project, Issue, Event, IssueComment, People
 
 class ConfigMock(object):
@@ -88,6 +90,26 @@ class GithubBackendTest(unittest.TestCase):
                                None, None, None, 'DEBUG', '123')
 
 
+    @staticmethod
+    def _store_issue(gh_backend, raw_issue):
+        issues_to_upsert = []
+        mongo_issue = gh_backend.store_issue(raw_issue, issues_to_upsert)
+        upsert_issues(issues_to_upsert)
+        return mongo_issue
+
+    @staticmethod
+    def _process_and_insert_events(gh_backend, mongo_issue, events):
+        events_to_insert = []
+        gh_backend._process_events(mongo_issue, events, events_to_insert)
+        upsert_issues([mongo_issue])
+        insert_documents(events_to_insert, [])
+
+    @staticmethod
+    def _process_and_insert_comments(gh_backend, mongo_issue, comments):
+        comments_to_insert = []
+        gh_backend._process_comments(mongo_issue, comments, comments_to_insert)
+        insert_documents([], comments_to_insert)
+
     @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     def test_get_people(self, mock_request):
         mock_request.return_value = self.person
@@ -99,23 +121,120 @@ class GithubBackendTest(unittest.TestCase):
         self.assertEqual('info@tomasvotruba.cz', mongo_person.email)
         self.assertEqual('Tomáš Votruba', mongo_person.name)
 
+    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
+    def test_prefetch_people(self, mock_request):
+        People.drop_collection()
+        mock_request.return_value = self.person
+
+        gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
+        gh_backend._prefetch_people([self.issue_6131], [(self.comments_issue_6131, self.events_issue_6131)], None,
+                                    mock.Mock(map=map))
+
+        mongo_person = People.objects(username='TomasVotruba').get()
+        self.assertEqual(1, People.objects.count())
+        self.assertEqual(mock_request.call_count, len(gh_backend.people))
+        self.assertEqual(mongo_person.id, gh_backend.people[self.issue_6131['user']['url']])
+
+        # Known people are not requested again
+        gh_backend._get_people(self.issue_6131['user']['url'])
+        self.assertEqual(len(gh_backend.people), mock_request.call_count)
+
+    @mock.patch('issueshark.backends.github.GithubBackend.get_issues')
+    def test_get_issue_pages(self, mock_issues):
+        mock_issues.side_effect = [[self.issue_6131], [self.issue_6050], []]
+
+        gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
+        pages = list(gh_backend._get_issue_pages(None))
+
+        self.assertEqual([[self.issue_6131], [self.issue_6050]], pages)
+        mock_issues.assert_has_calls([mock.call(pagecount=1, start_date=None), mock.call(pagecount=2, start_date=None),
+                                      mock.call(pagecount=3, start_date=None)])
+
+    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
+    def test_get_issue_details(self, mock_request):
+        mock_request.side_effect = [self.comments_issue_6131, self.events_issue_6131]
+
+        gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
+        comments, events = gh_backend._get_issue_details(self.issue_6131)
+
+        self.assertEqual(self.comments_issue_6131, comments)
+        self.assertEqual(self.events_issue_6131, events)
+        mock_request.assert_has_calls([mock.call('http://blub.de/6131/comments'),
+                                       mock.call('http://blub.de/6131/events')])
+
+        mock_request.reset_mock()
+        mock_request.side_effect = [self.events_issue_6131]
+        self.issue_6131['comments'] = 0
+        comments, events = gh_backend._get_issue_details(self.issue_6131)
+
+        self.assertEqual([], comments)
+        self.assertEqual(self.events_issue_6131, events)
+        mock_request.assert_called_once_with('http://blub.de/6131/events')
+
+    @mock.patch('issueshark.backends.github.time.sleep')
+    def test_wait_for_rate_limit(self, mock_sleep):
+        gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
+        gh_backend._wait_for_rate_limit()
+        self.assertIsNone(gh_backend.rate_limit_remaining)
+
+        gh_backend._update_rate_limit(mock.Mock(headers={'X-RateLimit-Remaining': '100',
+                                                         'X-RateLimit-Reset': str(time.time() + 100)}))
+        gh_backend._wait_for_rate_limit()
+        self.assertEqual(99, gh_backend.rate_limit_remaining)
+        mock_sleep.assert_not_called()
+
+        gh_backend.rate_limit_remaining = ISSUE_DETAIL_WORKERS
+        gh_backend._wait_for_rate_limit()
+        self.assertIsNone(gh_backend.rate_limit_remaining)
+        self.assertEqual(1, mock_sleep.call_count)
+        self.assertAlmostEqual(110, mock_sleep.call_args[0][0], delta=5)
+
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
     def test_store_issue_two_times(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6131)
-        gh_backend.store_issue(self.issue_6131)
+        self._store_issue(gh_backend, self.issue_6131)
+        self._store_issue(gh_backend, self.issue_6131)
 
         mongo_issue = Issue.objects(external_id='6131').all()
         self.assertEqual(1, len(mongo_issue))
 
+    @mock.patch('issueshark.backends.github.GithubBackend._get_people')
+    def test_store_issue_with_buffer(self, mock_people):
+        mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
+
+        gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
+        issues_to_upsert = []
+        mongo_issue = gh_backend.store_issue(self.issue_6131, issues_to_upsert)
+
+        self.assertIsNotNone(mongo_issue.id)
+        self.assertEqual([mongo_issue], issues_to_upsert)
+        self.assertEqual(0, Issue.objects(external_id='6131').count())
+
+        upsert_issues(issues_to_upsert)
+        self.assertEqual([], issues_to_upsert)
+
+        stored_issue = Issue.objects(external_id='6131').get()
+        self.assertEqual(mongo_issue.id, stored_issue.id)
+        self.assertEqual('Inexplainable dependency conflict', stored_issue.title)
+        self.assertListEqual(['Solver', 'Support'], stored_issue.labels)
+
+        # Stored issues of the page are updated instead of inserted again
+        stored_issues = gh_backend._get_stored_issues([self.issue_6131, self.issue_6050])
+        self.assertEqual(['6131'], list(stored_issues.keys()))
+
+        mongo_issue = gh_backend.store_issue(self.issue_6131, issues_to_upsert, stored_issues)
+        self.assertEqual(stored_issue.id, mongo_issue.id)
+        upsert_issues(issues_to_upsert)
+        self.assertEqual(1, Issue.objects(external_id='6131').count())
+
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
     def test_store_issue(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6131)
+        self._store_issue(gh_backend, self.issue_6131)
 
         mongo_issue = Issue.objects(external_id='6131').get()
         self.assertEqual(self.issues_system_id, mongo_issue.issue_system_id)
@@ -150,7 +269,7 @@ class GithubBackendTest(unittest.TestCase):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6050)
+        self._store_issue(gh_backend, self.issue_6050)
 
         mongo_issue = Issue.objects(external_id='6050').get()
         self.assertEqual(self.issues_system_id, mongo_issue.issue_system_id)
@@ -175,29 +294,25 @@ class GithubBackendTest(unittest.TestCase):
         self.assertListEqual(['Support'], mongo_issue.labels)
 
 
-    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
-    def test_store_events_two_times(self, mock_people, mock_request):
+    def test_store_events_two_times(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
-        mock_request.return_value = self.events_issue_6131
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6131)
-        gh_backend._process_events('6131', Issue.objects(external_id='6131').get())
-        gh_backend._process_events('6131', Issue.objects(external_id='6131').get())
+        self._store_issue(gh_backend, self.issue_6131)
+        self._process_and_insert_events(gh_backend, Issue.objects(external_id='6131').get(), self.events_issue_6131)
+        self._process_and_insert_events(gh_backend, Issue.objects(external_id='6131').get(), self.events_issue_6131)
 
         mongo_events = Event.objects.order_by('+created_at', '+external_id')
         self.assertEqual(6, len(mongo_events))
 
-    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
-    def test_store_events(self, mock_people, mock_request):
+    def test_store_events(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
-        mock_request.return_value = self.events_issue_6131
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6131)
-        gh_backend._process_events('6131', Issue.objects(external_id='6131').get())
+        self._store_issue(gh_backend, self.issue_6131)
+        self._process_and_insert_events(gh_backend, Issue.objects(external_id='6131').get(), self.events_issue_6131)
 
         mongo_issue = Issue.objects(external_id='6131').get()
 
@@ -252,15 +367,13 @@ class GithubBackendTest(unittest.TestCase):
         self.assertEqual(ObjectId('5899f79cfc263613115e5ccb'), event.author_id)
         self.assertEqual('referenced', event.status)
 
-    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
-    def test_store_events_2(self, mock_people, mock_request):
+    def test_store_events_2(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
-        mock_request.return_value = self.events_issue_6050
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6050)
-        gh_backend._process_events('6050', Issue.objects(external_id='6050').get())
+        self._store_issue(gh_backend, self.issue_6050)
+        self._process_and_insert_events(gh_backend, Issue.objects(external_id='6050').get(), self.events_issue_6050)
 
         mongo_issue = Issue.objects(external_id='6050').get()
 
@@ -290,33 +403,29 @@ class GithubBackendTest(unittest.TestCase):
         self.assertEqual(None, event.old_value)
         self.assertEqual('Support', event.new_value)
 
-    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
-    def test_store_comments_two_times(self, mock_people, mock_request):
+    def test_store_comments_two_times(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
-        mock_request.return_value = self.comments_issue_6131
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6131)
+        self._store_issue(gh_backend, self.issue_6131)
 
         mongo_issue = Issue.objects(external_id='6131').get()
-        gh_backend._process_comments('6131', mongo_issue)
-        gh_backend._process_comments('6131', mongo_issue)
+        self._process_and_insert_comments(gh_backend, mongo_issue, self.comments_issue_6131)
+        self._process_and_insert_comments(gh_backend, mongo_issue, self.comments_issue_6131)
 
         mongo_comments = IssueComment.objects.order_by('+created_at', '+external_id')
         self.assertEqual(3, len(mongo_comments))
 
-    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
-    def test_store_comments(self, mock_people, mock_request):
+    def test_store_comments(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
-        mock_request.return_value = self.comments_issue_6131
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6131)
+        self._store_issue(gh_backend, self.issue_6131)
 
         mongo_issue = Issue.objects(external_id='6131').get()
-        gh_backend._process_comments('6131', mongo_issue)
+        self._process_and_insert_comments(gh_backend, mongo_issue, self.comments_issue_6131)
 
         mongo_comments = IssueComment.objects.order_by('+created_at', '+external_id')
         self.assertEqual(3, len(mongo_comments))
@@ -356,17 +465,15 @@ class GithubBackendTest(unittest.TestCase):
                          "``composer update --with-dependencies`` or ``composer require  --update-with-dependencies``"
                          " does not work.", comment.comment)
 
-    @mock.patch('issueshark.backends.github.GithubBackend._send_request')
     @mock.patch('issueshark.backends.github.GithubBackend._get_people')
-    def test_store_comments_2(self, mock_people, mock_request):
+    def test_store_comments_2(self, mock_people):
         mock_people.return_value = ObjectId('5899f79cfc263613115e5ccb')
-        mock_request.return_value = self.comments_issue_6050
 
         gh_backend = GithubBackend(self.conf, self.issues_system_id, self.project_id)
-        gh_backend.store_issue(self.issue_6050)
+        self._store_issue(gh_backend, self.issue_6050)
 
         mongo_issue = Issue.objects(external_id='6050').get()
-        gh_backend._process_comments('6131', mongo_issue)
+        self._process_and_insert_comments(gh_backend, mongo_issue, self.comments_issue_6050)
 
         mongo_comments = IssueComment.objects.order_by('+created_at', '+external_id')
         self.assertEqual(2, len(mongo_comments))
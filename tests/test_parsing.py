@@ -0,0 +1,33 @@
+import datetime
+import unittest
+
+import mock
+
+from issueshark.backends.helpers import parsing
+from issueshark.backends.helpers.parsing import as_utc, parse_date, parse_response
+
+
+class ParsingTest(unittest.TestCase):
+
+    def test_parse_date(self):
+        expected = datetime.datetime(2001, 1, 10, 20, 38, 40, tzinfo=datetime.timezone.utc)
+        self.assertEqual(expected, parse_date('2001-01-10T20:38:40Z'))
+        self.assertEqual(expected, parse_date('Wed, 10 Jan 2001 20:38:40 UTC'))
+
+    def test_as_utc(self):
+        expected = datetime.datetime(2001, 1, 10, 20, 38, 40, tzinfo=datetime.timezone.utc)
+        self.assertEqual(expected, as_utc(datetime.datetime(2001, 1, 10, 20, 38, 40)))
+
+        cet = datetime.timezone(datetime.timedelta(hours=1))
+        self.assertEqual(datetime.timezone.utc,
+                         as_utc(datetime.datetime(2001, 1, 10, 21, 38, 40, tzinfo=cet)).tzinfo)
+        self.assertEqual(expected, as_utc(datetime.datetime(2001, 1, 10, 21, 38, 40, tzinfo=cet)))
+
+    def test_parse_response(self):
+        resp = mock.Mock(content=b'{"bugs": [{"id": 1}]}')
+        resp.json.return_value = {'bugs': [{'id': 1}]}
+        self.assertEqual({'bugs': [{'id': 1}]}, parse_response(resp))
+
+        with mock.patch.object(parsing, 'orjson', None):
+            self.assertEqual({'bugs': [{'id': 1}]}, parse_response(resp))
+            resp.json.assert_called_once_with()
@@ -0,0 +1,115 @@
+import datetime
+import unittest
+
+import mock
+import mongoengine
+import mongomock
+from bson import ObjectId
+
+from issueshark.backends.helpers import storage
+from issueshark.backends.helpers.storage import bulk_insert, create_indexes, insert_documents, store_people, \
+    upsert_issues
+from pycoshark.mongomodels import IssueSystem, Project, Issue, Event, IssueComment, People
+
+
+class StorageTest(unittest.TestCase):
+
+    def setUp(self):
+        mongoengine.connection.disconnect()
+        mongoengine.connect('testdb', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+        Project.drop_collection()
+        IssueSystem.drop_collection()
+        Issue.drop_collection()
+        IssueComment.drop_collection()
+        Event.drop_collection()
+        People.drop_collection()
+
+        self.project_id = Project(name='Bla').save().id
+        self.issues_system_id = IssueSystem(project_id=self.project_id,
+                                            url="https://issues.apache.org/search?jql=project=BLA",
+                                            last_updated=datetime.datetime.now()).save().id
+
+    def test_upsert_issues(self):
+        issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id, title='Title', desc='Desc').save()
+        new_issue = Issue(id=ObjectId(), external_id="NEW", issue_system_id=self.issues_system_id, title='New')
+
+        issue.title = 'New title'
+        issue.desc = None
+        issues_to_upsert = [issue, new_issue]
+        upsert_issues(issues_to_upsert)
+
+        self.assertEqual(0, len(issues_to_upsert))
+        mongo_issue = Issue.objects(id=issue.id).get()
+        self.assertEqual('New title', mongo_issue.title)
+        self.assertIsNone(mongo_issue.desc)
+        self.assertEqual('New', Issue.objects(external_id='NEW').get().title)
+
+    def test_upsert_issues_keeps_concurrent_changes(self):
+        Issue(external_id="TEST", issue_system_id=self.issues_system_id, title='Title', issue_type='Bug').save()
+        issue = Issue.objects(external_id="TEST").get()
+
+        # Another tool changes the issue after it was loaded
+        parent_issue_id = ObjectId()
+        Issue.objects(id=issue.id).update_one(set__issue_type_verified='improvement',
+                                              set__parent_issue_id=parent_issue_id, set__title='Other title')
+
+        issue.issue_type = 'Enhancement'
+        upsert_issues([issue])
+
+        mongo_issue = Issue.objects(id=issue.id).get()
+        self.assertEqual('Enhancement', mongo_issue.issue_type)
+        self.assertEqual('improvement', mongo_issue.issue_type_verified)
+        self.assertEqual(parent_issue_id, mongo_issue.parent_issue_id)
+        self.assertEqual('Other title', mongo_issue.title)
+
+        # Unchanged issues are not written at all
+        unchanged_issue = Issue.objects(id=issue.id).get()
+        with mock.patch.object(Issue, '_get_collection') as get_collection_mock:
+            upsert_issues([unchanged_issue])
+            get_collection_mock.assert_not_called()
+
+    def test_insert_documents(self):
+        issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id).save()
+        events_to_insert = [Event(issue_id=issue.id, external_id='1', status='created')]
+        comments_to_insert = [IssueComment(issue_id=issue.id, external_id='1', comment='Comment')]
+        insert_documents(events_to_insert, comments_to_insert)
+
+        self.assertEqual(0, len(events_to_insert))
+        self.assertEqual(0, len(comments_to_insert))
+        self.assertEqual(1, Event.objects(issue_id=issue.id).count())
+        self.assertEqual('Comment', IssueComment.objects(issue_id=issue.id).get().comment)
+
+    @mock.patch.object(storage, 'BULK_INSERT_SIZE', 2)
+    def test_bulk_insert_in_chunks(self):
+        issue = Issue(external_id="TEST", issue_system_id=self.issues_system_id).save()
+        events = [Event(issue_id=issue.id, external_id=str(i), status='created') for i in range(3)]
+        events.append(Event(issue_id=issue.id, external_id='3', status='created').to_mongo().to_dict())
+
+        collection = Event._get_collection()
+        with mock.patch.object(collection, 'insert_many', wraps=collection.insert_many) as insert_many_mock:
+            bulk_insert(Event, events)
+
+        self.assertEqual(2, insert_many_mock.call_count)
+        self.assertEqual({'0', '1', '2', '3'}, set(Event.objects.scalar('external_id')))
+
+    @mock.patch.object(storage, '_indexes_created', False)
+    def test_create_indexes(self):
+        create_indexes()
+
+        self.assertTrue(storage._indexes_created)
+        self.assertIn([('issue_id', 1), ('external_id', 1)],
+                      [index['key'] for index in Event._get_collection().index_information().values()])
+        self.assertIn([('issue_system_id', 1), ('external_id', 1)],
+                      [index['key'] for index in Issue._get_collection().index_information().values()])
+
+    def test_store_people(self):
+        stored_id = People(name='Hans', email='hans@example.org', username='old').save().id
+
+        people_ids = store_people([('hans', 'Hans', 'hans@example.org', 'hans'),
+                                   ('peter', 'Peter', 'peter@example.org', 'peter')])
+
+        self.assertEqual(stored_id, people_ids['hans'])
+        self.assertEqual('hans', People.objects(id=stored_id).get().username)
+        self.assertEqual('Peter', People.objects(id=people_ids['peter']).get().name)
+        self.assertEqual(2, People.objects.count())
+        self.assertEqual({}, store_people([]))